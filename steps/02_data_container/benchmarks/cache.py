@@ -0,0 +1,127 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = ["IntervalFeatureCache", "fingerprint"]
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def fingerprint(*arrays):
+    """Hash of the dtype, shape and contents of one or more arrays, used to
+    recognise the same data across fits
+
+    Parameters
+    ----------
+    arrays : numpy arrays
+
+    Returns
+    -------
+    fingerprint : str
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        h.update(f"{array.dtype.str}{array.shape}".encode())
+        h.update(array.reshape(-1).view(np.uint8))
+    return h.hexdigest()
+
+
+class IntervalFeatureCache:
+    """Least-recently-used cache of interval features under a byte budget
+
+    Entries are keyed by the fingerprint of the data and the (start, end)
+    of the interval, and its variable if intervals are drawn separately
+    for each variable. The cache can be shared between estimators and is not
+    copied when an estimator is cloned, e.g. in cross-validation or
+    hyperparameter search; it is thread-safe but not shared between
+    processes.
+
+    Parameters
+    ----------
+    max_bytes : int, optional (default=2 ** 30)
+        Maximum total size of the cached features, least recently used
+        entries are evicted first
+
+    Attributes
+    ----------
+    hits, misses, evictions : int
+    nbytes : int
+        Total size of the cached features
+    """
+
+    def __init__(self, max_bytes=2 ** 30):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Cached features for key, or None if not cached"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Cache features for key, evicting the least recently used entries
+        to stay within the byte budget; features larger than the budget are
+        not cached"""
+        if value.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key).nbytes
+            self._entries[key] = value
+            self.nbytes += value.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all entries and reset the statistics"""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    @property
+    def stats(self):
+        """Hit/miss statistics and size of the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "n_entries": len(self),
+            "nbytes": self.nbytes,
+        }
+
+    def __deepcopy__(self, memo):
+        # shared rather than copied when estimators are cloned
+        return self
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = []
+
+import tracemalloc
+
+import pytest
+
+from benchmarks.utils import nbytes
+
+
+def pytest_addoption(parser):
+    parser.addoption("--skip-memory", action="store_true", default=False,
+                     help="do not record the memory usage of benchmarks")
+
+
+class MemoryBenchmark:
+    """Wrapper of the pytest-benchmark fixture, which also records the
+    memory usage of the benchmarked function in the extra info of the
+    benchmark, so that it is stored in the same JSON as the timings:
+
+    * peak_memory: peak memory traced by tracemalloc during one call, in
+      bytes,
+    * container_nbytes: total size of the data containers passed as
+      arguments, in bytes.
+
+    tracemalloc only traces the memory in use, not the number of
+    allocations, so no allocation count is recorded.
+
+    The memory is measured in a separate call before the timed rounds, so
+    that tracing does not affect the timings, also for pedantic benchmarks,
+    whose memory call gets its own arguments from setup. All other
+    attributes are those of the wrapped fixture.
+
+    Parameters
+    ----------
+    fixture : pytest_benchmark.fixture.BenchmarkFixture
+    track_memory : bool, optional (default=True)
+    """
+
+    def __init__(self, fixture, track_memory=True):
+        # set on the wrapper itself, other attributes go to the fixture
+        object.__setattr__(self, "_fixture", fixture)
+        object.__setattr__(self, "track_memory", track_memory)
+
+    def __getattr__(self, name):
+        return getattr(self._fixture, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._fixture, name, value)
+
+    def __call__(self, function_to_benchmark, *args, **kwargs):
+        if self.track_memory and not self.disabled:
+            self._record_memory(function_to_benchmark, args, kwargs)
+        return self._fixture(function_to_benchmark, *args, **kwargs)
+
+    def pedantic(self, target, args=(), kwargs=None, setup=None, **options):
+        if self.track_memory and not self.disabled:
+            memory_args, memory_kwargs = args, kwargs
+            if setup is not None:
+                # setup outside of the traced call, as before each round
+                setup_result = setup()
+                if setup_result is not None:
+                    memory_args, memory_kwargs = setup_result
+            self._record_memory(target, memory_args, memory_kwargs or {})
+        return self._fixture.pedantic(target, args=args, kwargs=kwargs,
+                                      setup=setup, **options)
+
+    def _record_memory(self, function, args, kwargs):
+        sizes = [nbytes(arg) for arg in list(args) + list(kwargs.values())]
+        sizes = [size for size in sizes if size is not None]
+
+        tracemalloc.start()
+        try:
+            result = function(*args, **kwargs)
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del result
+
+        self.extra_info["peak_memory"] = peak_memory
+        self.extra_info["container_nbytes"] = sum(sizes) if sizes else None
+
+
+@pytest.fixture
+def benchmark(benchmark, request):
+    """pytest-benchmark fixture which also records memory usage"""
+    return MemoryBenchmark(
+        benchmark,
+        track_memory=not request.config.getoption("--skip-memory"))
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = ["create_panel", "save_panel", "load_panel", "load_time_index"]
+
+import json
+import os
+
+import numpy as np
+
+# A panel on disk is a directory with a JSON header holding the shape,
+# dtype and time index, and a raw C-ordered data file of shape
+# [n_instances, n_variables, n_timepoints] that is memory-mapped on loading
+HEADER_FILE = "header.json"
+DATA_FILE = "data.bin"
+
+
+def create_panel(path, shape, dtype=np.float64, time_index=None):
+    """Create an empty panel on disk, which can be filled in chunks
+
+    Parameters
+    ----------
+    path : str
+        Directory of the panel, created if it does not exist
+    shape : tuple of (n_instances, n_variables, n_timepoints)
+    dtype : numpy dtype, optional (default=np.float64)
+    time_index : array-like of shape = [n_timepoints], optional
+        Defaults to 0, ..., n_timepoints - 1
+
+    Returns
+    -------
+    X : writable np.memmap of the given shape
+    """
+    if len(shape) != 3:
+        raise ValueError("Panels must have shape (n_instances, n_variables, "
+                         "n_timepoints)")
+    if time_index is None:
+        time_index = np.arange(shape[2])
+    time_index = np.asarray(time_index)
+    if time_index.shape != (shape[2],):
+        raise ValueError("Time index must have n_timepoints values")
+
+    os.makedirs(path, exist_ok=True)
+    header = {
+        "shape": [int(n) for n in shape],
+        "dtype": np.dtype(dtype).str,
+        "time_index": time_index.astype(str).tolist(),
+        "time_index_dtype": time_index.dtype.str,
+    }
+    with open(os.path.join(path, HEADER_FILE), "w") as f:
+        json.dump(header, f)
+    return np.memmap(os.path.join(path, DATA_FILE), dtype=dtype, mode="w+",
+                     shape=tuple(shape))
+
+
+def save_panel(path, X, time_index=None, chunk_size=1000):
+    """Write a 3d numpy array to disk in chunks of instances
+
+    Parameters
+    ----------
+    path : str
+    X : array of shape = [n_instances, n_variables, n_timepoints]
+    time_index : array-like of shape = [n_timepoints], optional
+    chunk_size : int, optional (default=1000)
+    """
+    data = create_panel(path, X.shape, dtype=X.dtype, time_index=time_index)
+    for start in range(0, X.shape[0], chunk_size):
+        data[start:start + chunk_size] = X[start:start + chunk_size]
+    data.flush()
+
+
+def load_panel(path, mode="r"):
+    """Memory-map a panel on disk without reading it into memory
+
+    Parameters
+    ----------
+    path : str
+    mode : str, optional (default="r")
+        Mode of np.memmap, "r+" to modify the panel in place
+
+    Returns
+    -------
+    X : np.memmap of shape = [n_instances, n_variables, n_timepoints]
+    """
+    header = _read_header(path)
+    return np.memmap(os.path.join(path, DATA_FILE), dtype=header["dtype"],
+                     mode=mode, shape=tuple(header["shape"]))
+
+
+def load_time_index(path):
+    """Time index of a panel on disk
+
+    Returns
+    -------
+    time_index : array of shape = [n_timepoints]
+    """
+    header = _read_header(path)
+    return np.asarray(header["time_index"]).astype(
+        header["time_index_dtype"])
+
+
+def _read_header(path):
+    with open(os.path.join(path, HEADER_FILE)) as f:
+        return json.load(f)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = ["NUMBA_AVAILABLE", "fused_interval_features"]
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# numba is optional, callers fall back to the numpy kernels without it
+NUMBA_AVAILABLE = njit is not None
+
+
+def _fused_features(X, starts, ends, order, bounds, out):
+    """Mean, standard deviation and slope of all intervals, one series at
+    a time
+
+    For each series, the running sums of the centred values x, x ** 2 and
+    t * x are accumulated into a scratch buffer in a single pass, from
+    which the statistics of all intervals on that series follow in
+    constant time, as in `tsf._interval_features`. No temporaries are
+    allocated apart from the scratch buffer of size 3 * (series_length +
+    1), which is in double precision whatever the dtype of the features,
+    as in `tsf._cumulative_sums`.
+
+    Parameters
+    ----------
+    X : array of shape = [n_instances, n_variables, series_length]
+    starts, ends : arrays of shape = [n_intervals]
+    order : array of shape = [n_intervals]
+        Indices of the intervals sorted by variable
+    bounds : array of shape = [n_variables + 1]
+        Start of the intervals of each variable in order
+    out : array of shape = [n_instances, n_intervals, 3]
+    """
+    n_instances, n_variables, series_length = X.shape
+    sums = np.zeros((3, series_length + 1))
+    for i in range(n_instances):
+        for v in range(n_variables):
+            if bounds[v] == bounds[v + 1]:
+                continue
+            mean = 0.0
+            for t in range(series_length):
+                mean += X[i, v, t]
+            mean /= series_length
+
+            s0 = 0.0
+            s1 = 0.0
+            s2 = 0.0
+            for t in range(series_length):
+                x = X[i, v, t] - mean
+                s0 += x
+                s1 += x * x
+                s2 += t * x
+                sums[0, t + 1] = s0
+                sums[1, t + 1] = s1
+                sums[2, t + 1] = s2
+
+            for k in range(bounds[v], bounds[v + 1]):
+                j = order[k]
+                start = starts[j]
+                end = ends[j]
+                length = end - start
+                m = (sums[0, end] - sums[0, start]) / length
+                var = (sums[1, end] - sums[1, start]) / length - m * m
+                t_mean = start + (length - 1) / 2
+                t_var = (length * length - 1) / 12
+                slope = ((sums[2, end] - sums[2, start]) / length
+                         - t_mean * m) / t_var
+                out[i, j, 0] = m + mean
+                out[i, j, 1] = np.sqrt(var) if var > 0 else 0.0
+                out[i, j, 2] = slope
+
+
+if NUMBA_AVAILABLE:
+    # nogil so that joblib's threading backend runs jobs in parallel, and
+    # numpy's semantics for division by zero as in the numpy kernels
+    _fused_features = njit(nogil=True, cache=True,
+                           error_model="numpy")(_fused_features)
+
+
+def fused_interval_features(X, intervals, variables=None, dtype=np.float64):
+    """Interval features of a 3d numpy array computed by the compiled
+    kernel, see `tsf._BaseTimeSeriesForest._transform`
+
+    Requires numba, see NUMBA_AVAILABLE.
+    """
+    if not NUMBA_AVAILABLE:
+        raise ImportError("numba is required for the compiled kernels")
+    n_instances, n_variables, _ = X.shape
+    shape = intervals.shape[:-1]
+    if variables is None:
+        # extract every interval from every variable
+        shape += (n_variables,)
+        intervals = np.broadcast_to(intervals[..., np.newaxis, :],
+                                    shape + (2,))
+        variables = np.arange(n_variables)
+    flat_intervals = intervals.reshape(-1, 2)
+    flat_variables = np.broadcast_to(variables, shape).ravel()
+
+    order = np.argsort(flat_variables, kind="stable")
+    bounds = np.searchsorted(flat_variables[order],
+                             np.arange(n_variables + 1))
+    out = np.empty((n_instances, flat_intervals.shape[0], 3), dtype=dtype)
+    _fused_features(np.asarray(X),
+                    np.ascontiguousarray(flat_intervals[:, 0]),
+                    np.ascontiguousarray(flat_intervals[:, 1]),
+                    order, bounds, out)
+    return out.reshape((n_instances,) + shape + (3,))
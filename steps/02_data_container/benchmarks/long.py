@@ -0,0 +1,214 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = ["LongPanel"]
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.ragged import RaggedPanel
+from benchmarks.utils import _nested_to_buffers
+
+
+class LongPanel:
+    """Panel in long format, with one row per observation of a series, as
+    e.g. stored in a table of a relational database
+
+    The instance, variable, time and value columns are stored as arrays
+    sorted by instance, variable and time, so that the rows of each series
+    are contiguous and its start is given by offsets. Reductions over time
+    and time slices are computed for all series at once on the values and
+    times columns, which have the same layout as the buffers of a
+    RaggedPanel.
+
+    Parameters
+    ----------
+    instances : array of ints of shape = [n_points]
+        Instance of each row, numbered from 0
+    variables : array of ints of shape = [n_points]
+        Variable of each row, numbered from 0
+    times : array of shape = [n_points]
+    values : array of shape = [n_points]
+    n_instances : int, optional (default=None)
+        Defaults to the largest instance plus one
+    n_variables : int, optional (default=None)
+        Defaults to the largest variable plus one
+    """
+
+    def __init__(self, instances, variables, times, values, n_instances=None,
+                 n_variables=None):
+        instances = np.asarray(instances, dtype=np.int64)
+        variables = np.asarray(variables, dtype=np.int64)
+        times = np.asarray(times)
+        values = np.asarray(values)
+        if not instances.shape == variables.shape == times.shape == \
+                values.shape:
+            raise ValueError("All columns must have the same length")
+        if n_instances is None:
+            n_instances = int(instances.max()) + 1 if instances.size else 0
+        if n_variables is None:
+            n_variables = int(variables.max()) + 1 if variables.size else 0
+
+        series = instances * n_variables + variables
+        if not _is_sorted(series, times):
+            order = _sort_order(series, times, n_instances * n_variables)
+            instances, variables, series = \
+                instances[order], variables[order], series[order]
+            times, values = times[order], values[order]
+
+        self.instances = instances
+        self.variables = variables
+        self.times = times
+        self.values = values
+        self.n_instances = n_instances
+        self.n_variables = n_variables
+        # start of each series, which are empty if they have no rows
+        self.offsets = np.zeros(n_instances * n_variables + 1, dtype=np.int64)
+        np.cumsum(np.bincount(series, minlength=n_instances * n_variables),
+                  out=self.offsets[1:])
+
+    @classmethod
+    def from_frame(cls, X, instance="instance", variable="variable",
+                   time="time", value="value"):
+        """Construct from a pd.DataFrame in long format
+
+        Instances and variables are numbered in the sorted order of their
+        labels.
+        """
+        instances, instance_labels = pd.factorize(X[instance], sort=True)
+        variables, variable_labels = pd.factorize(X[variable], sort=True)
+        return cls(instances, variables, X[time].to_numpy(),
+                   X[value].to_numpy(), n_instances=len(instance_labels),
+                   n_variables=len(variable_labels))
+
+    @classmethod
+    def from_ragged(cls, X):
+        """Construct from a RaggedPanel"""
+        n_instances, n_variables = X.shape
+        offsets = X.offsets - X.offsets[0]
+        series = np.repeat(np.arange(n_instances * n_variables),
+                           np.diff(offsets))
+        return cls._from_sorted(series // n_variables, series % n_variables,
+                                X._points(X.times), X._points(X.values),
+                                offsets, n_variables)
+
+    @classmethod
+    def from_3d_numpy(cls, X, time_index=None):
+        """Construct from a 3d numpy array of shape = [n_instances,
+        n_variables, n_timepoints]"""
+        n_instances, n_variables, n_timepoints = X.shape
+        if time_index is None:
+            time_index = np.arange(n_timepoints)
+        n_series = n_instances * n_variables
+        return cls._from_sorted(
+            np.repeat(np.arange(n_instances), n_variables * n_timepoints),
+            np.tile(np.repeat(np.arange(n_variables), n_timepoints),
+                    n_instances),
+            np.tile(np.asarray(time_index), n_series),
+            np.ascontiguousarray(X).ravel(),
+            np.arange(0, n_series * n_timepoints + 1, n_timepoints),
+            n_variables)
+
+    @classmethod
+    def _from_sorted(cls, instances, variables, times, values, offsets,
+                     n_variables):
+        """Construct from columns known to be sorted and their offsets,
+        skipping the checks and grouping of the constructor"""
+        X = cls.__new__(cls)
+        X.instances = instances
+        X.variables = variables
+        X.times = times
+        X.values = values
+        X.n_instances = (offsets.shape[0] - 1) // n_variables
+        X.n_variables = n_variables
+        X.offsets = np.asarray(offsets, dtype=np.int64)
+        return X
+
+    @classmethod
+    def from_nested(cls, X):
+        """Construct from a nested pd.DataFrame"""
+        times, values, offsets, n_variables = _nested_to_buffers(X)
+        return cls.from_ragged(RaggedPanel(values, times, offsets,
+                                           n_variables))
+
+    @property
+    def shape(self):
+        """Number of instances and variables"""
+        return self.n_instances, self.n_variables
+
+    @property
+    def lengths(self):
+        """Length of each series, of shape = [n_instances, n_variables]"""
+        return np.diff(self.offsets).reshape(self.shape)
+
+    @property
+    def nbytes(self):
+        return self.instances.nbytes + self.variables.nbytes + \
+            self.times.nbytes + self.values.nbytes + self.offsets.nbytes
+
+    def __len__(self):
+        return self.n_instances
+
+    def to_frame(self, instance="instance", variable="variable",
+                 time="time", value="value"):
+        """Convert into a pd.DataFrame in long format"""
+        return pd.DataFrame({instance: self.instances,
+                             variable: self.variables, time: self.times,
+                             value: self.values})
+
+    def to_ragged(self):
+        """Convert into a RaggedPanel, which shares the values and times"""
+        return RaggedPanel(self.values, self.times, self.offsets,
+                           self.n_variables)
+
+    def to_3d_numpy(self):
+        """Convert equal-length panels into a 3d numpy array, which is a
+        view of the values"""
+        return self.to_ragged().to_3d_numpy()
+
+    def sum(self, axis=-1, dtype=None, out=None):
+        """Sum over time of each series"""
+        return self.to_ragged().sum(axis=axis, dtype=dtype, out=out)
+
+    def mean(self, axis=-1, dtype=None, out=None):
+        """Mean over time of each series, nan for empty series"""
+        return self.to_ragged().mean(axis=axis, dtype=dtype, out=out)
+
+    def std(self, axis=-1, dtype=None, out=None, ddof=0):
+        """Standard deviation over time of each series, nan for empty
+        series"""
+        return self.to_ragged().std(axis=axis, dtype=dtype, out=out,
+                                    ddof=ddof)
+
+    def __getitem__(self, key):
+        """Slice instances, variables and time points, see
+        `RaggedPanel.__getitem__`"""
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) > 3:
+            raise IndexError("too many indices for LongPanel")
+        return LongPanel.from_ragged(self.to_ragged()[key])
+
+
+def _is_sorted(series, times):
+    """Whether rows are sorted by series and then time"""
+    if series.shape[0] < 2:
+        return True
+    series_step = np.diff(series)
+    if np.any(series_step < 0):
+        return False
+    # times only need to increase within each series
+    return bool(np.all((series_step > 0) | (times[1:] >= times[:-1])))
+
+
+def _sort_order(series, times, n_series):
+    """Order of rows sorted by series and then time"""
+    # stable sorts of small integers are radix sorts, which run in linear
+    # time; rows from a database are often in time order within each
+    # series already, e.g. if the rows of the series are interleaved
+    order = np.argsort(series.astype(np.min_scalar_type(n_series)),
+                       kind="stable")
+    if _is_sorted(series[order], times[order]):
+        return order
+    return np.lexsort((times, series))
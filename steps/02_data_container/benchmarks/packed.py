@@ -0,0 +1,146 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = ["PackedForest"]
+
+import numpy as np
+
+
+class PackedForest:
+    """Forest of fitted decision trees packed into flat node arrays, so
+    that all trees can be evaluated on all instances in one vectorised
+    traversal instead of one sklearn call per tree
+
+    Nodes of all trees are concatenated; children point into the
+    concatenated arrays and leaves point to themselves, so that instances
+    stay at their leaf once they reach it.
+
+    Parameters
+    ----------
+    column : array of shape = [n_nodes]
+        Column of the split feature in the flattened features of all trees
+    threshold : array of shape = [n_nodes]
+    left, right : arrays of shape = [n_nodes]
+        Children of each node
+    value : array of shape = [n_nodes, n_classes]
+        Class probabilities of each node
+    roots : array of shape = [n_trees]
+    max_depth : int
+    """
+
+    def __init__(self, column, threshold, left, right, value, roots,
+                 max_depth):
+        self.column = column
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_trees(cls, trees):
+        """Pack fitted trees which all have the same number of features
+        and classes
+
+        Parameters
+        ----------
+        trees : list of fitted DecisionTreeClassifier
+
+        Returns
+        -------
+        forest : PackedForest
+        """
+        columns, thresholds, lefts, rights, values = [], [], [], [], []
+        roots = np.zeros(len(trees), dtype=np.intp)
+        offset = 0
+        for i, tree in enumerate(trees):
+            tree_ = tree.tree_
+            nodes = np.arange(tree_.node_count)
+            is_leaf = tree_.children_left == -1
+            roots[i] = offset
+            # split on the features of tree i, leaves never split
+            columns.append(np.where(is_leaf, 0,
+                                    i * tree_.n_features + tree_.feature))
+            thresholds.append(tree_.threshold)
+            lefts.append(offset + np.where(is_leaf, nodes,
+                                           tree_.children_left))
+            rights.append(offset + np.where(is_leaf, nodes,
+                                            tree_.children_right))
+            # normalise counts to probabilities as in predict_proba
+            value = tree_.value[:, 0, :]
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+            offset += tree_.node_count
+
+        return cls(
+            column=np.concatenate(columns).astype(np.intp),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values),
+            roots=roots,
+            max_depth=max(tree.tree_.max_depth for tree in trees))
+
+    @property
+    def n_trees(self):
+        return self.roots.shape[0]
+
+    def apply(self, X):
+        """Leaf reached by each instance in each tree
+
+        Parameters
+        ----------
+        X : array of shape = [n_instances, n_trees, n_features]
+            Features of each tree
+
+        Returns
+        -------
+        leaves : array of shape = [n_instances, n_trees]
+        """
+        n_instances = X.shape[0]
+        # compare in single precision, as sklearn trees do
+        X = np.asarray(X, dtype=np.float32).reshape(n_instances, -1)
+        return self.apply_lazy(lambda rows, columns: X[rows, columns],
+                               n_instances)
+
+    def apply_lazy(self, features, n_instances):
+        """Leaf reached by each instance in each tree, only computing the
+        features the trees split on along the way
+
+        Parameters
+        ----------
+        features : callable
+            Called with arrays of instances of shape = [n_instances, 1]
+            and columns of shape = [n_instances, n_trees], returning the
+            values of these columns in the flattened features of all trees
+        n_instances : int
+
+        Returns
+        -------
+        leaves : array of shape = [n_instances, n_trees]
+        """
+        rows = np.arange(n_instances)[:, np.newaxis]
+        nodes = np.repeat(self.roots[np.newaxis], n_instances, axis=0)
+        for _ in range(self.max_depth):
+            values = np.asarray(features(rows, self.column[nodes]),
+                                dtype=np.float32)
+            go_left = values <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        """Class probabilities of each tree
+
+        Parameters
+        ----------
+        X : array of shape = [n_instances, n_trees, n_features]
+            Features of each tree
+
+        Returns
+        -------
+        proba : array of shape = [n_instances, n_trees, n_classes]
+        """
+        return self.value[self.apply(X)]
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = ["Panel"]
+
+import awkward1 as ak
+import numpy as np
+import pandas as pd
+
+from benchmarks.long import LongPanel
+from benchmarks.ragged import RaggedPanel
+from benchmarks.utils import ak_values
+
+
+class Panel:
+    """Lazy view of a panel stored in any of the benchmarked containers
+
+    Slicing instances, variables and time points only records the
+    selection; chained slices are composed into a single selection without
+    touching the data. The data is only sliced when it is materialized,
+    reduced over time or passed to an estimator.
+
+    Parameters
+    ----------
+    data : 3d numpy array, awkward array, nested pd.DataFrame, RaggedPanel
+    or LongPanel of shape = [n_instances, n_variables, n_timepoints]
+    instances : range, optional (default=None)
+        Selected instances, defaults to all instances
+    variables : range, optional (default=None)
+        Selected variables, defaults to all variables
+    time : tuple of slices, optional (default=())
+        Positional time slices applied in order to each series
+    """
+
+    def __init__(self, data, instances=None, variables=None, time=()):
+        if not isinstance(data, (np.ndarray, ak.highlevel.Array,
+                                 pd.DataFrame, RaggedPanel, LongPanel)):
+            raise TypeError(f"Unsupported container: {type(data)}")
+        if isinstance(data, np.ndarray) and data.ndim != 3:
+            raise ValueError("numpy panels must have shape (n_instances, "
+                             "n_variables, n_timepoints)")
+        self.data = data
+        n_instances, n_variables = _data_shape(data)
+        self.instances = range(n_instances) if instances is None \
+            else instances
+        self.variables = range(n_variables) if variables is None \
+            else variables
+        self.time = tuple(time)
+
+    @property
+    def shape(self):
+        """Number of selected instances, variables and time points, the
+        latter is None if series may have unequal length"""
+        n_timepoints = None
+        if isinstance(self.data, np.ndarray):
+            n_timepoints = len(self._time_range())
+        return len(self.instances), len(self.variables), n_timepoints
+
+    def __len__(self):
+        return len(self.instances)
+
+    def __getitem__(self, key):
+        """Slice instances, variables and time points, returning a new
+        view without copying or slicing the data"""
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) > 3:
+            raise IndexError("too many indices for Panel")
+        key = key + (slice(None),) * (3 - len(key))
+        if not all(isinstance(k, slice) for k in key):
+            raise TypeError("Panel only supports slices")
+        instances, variables, time = key
+
+        time = self.time + (time,) if time != slice(None) else self.time
+        if isinstance(self.data, np.ndarray):
+            # series lengths are known, so any time slices compose
+            time = (_to_slice(_compose(self.data.shape[2], time)),)
+        elif len(time) > 1:
+            composed = _compose_clipped(time[-2], time[-1])
+            if composed is not None:
+                time = time[:-2] + (composed,)
+        return Panel(self.data, self.instances[instances],
+                     self.variables[variables], time)
+
+    def materialize(self):
+        """Slice the data, returning a container of the same type"""
+        instances = _to_slice(self.instances)
+        variables = _to_slice(self.variables)
+        if isinstance(self.data, pd.DataFrame):
+            X = self.data.iloc[instances, variables]
+            if not self.time:
+                return X
+            return X.applymap(lambda cell: _slice_time(cell, self.time))
+
+        # numpy, awkward, ragged and long panels slice each series
+        # positionally
+        X = self.data[instances, variables]
+        for time in self.time:
+            X = X[:, :, time]
+        return X
+
+    def to_numpy(self):
+        """Materialize equal-length panels as a 3d numpy array"""
+        if isinstance(self.data, pd.DataFrame):
+            cells = self.data.iloc[_to_slice(self.instances),
+                                   _to_slice(self.variables)].to_numpy()
+            values = [_slice_time(cell.to_numpy(), self.time)
+                      for cell in cells.ravel()]
+            if len(values) == 0:
+                return np.empty(cells.shape + (0,))
+            return np.stack(values).reshape(cells.shape + (-1,))
+
+        X = self.materialize()
+        if isinstance(X, (RaggedPanel, LongPanel)):
+            return X.to_3d_numpy()
+        if isinstance(X, ak.highlevel.Array):
+            return np.asarray(ak_values(X))
+        return X
+
+    def __array__(self, dtype=None):
+        X = self.to_numpy()
+        return X if dtype is None else X.astype(dtype, copy=False)
+
+    def sum(self, axis=-1):
+        """Sum over time of each selected series"""
+        return self._reduce("sum", axis)
+
+    def mean(self, axis=-1):
+        """Mean over time of each selected series"""
+        return self._reduce("mean", axis)
+
+    def std(self, axis=-1):
+        """Standard deviation over time of each selected series"""
+        return self._reduce("std", axis)
+
+    def _reduce(self, name, axis):
+        if axis not in (-1, 2):
+            raise NotImplementedError("Panel only supports reductions over "
+                                      "time")
+        reduce = getattr(np, name)
+        if isinstance(self.data, pd.DataFrame):
+            cells = self.data.iloc[_to_slice(self.instances),
+                                   _to_slice(self.variables)].to_numpy()
+            return np.array([[reduce(_slice_time(cell.to_numpy(), self.time))
+                              for cell in row] for row in cells])
+
+        X = self.materialize()
+        if isinstance(X, (RaggedPanel, LongPanel)):
+            return getattr(X, name)(axis=-1)
+        if isinstance(X, ak.highlevel.Array):
+            return np.asarray(reduce(ak_values(X), axis=-1))
+        return reduce(X, axis=-1)
+
+    def _time_range(self):
+        return _compose(self.data.shape[2], self.time)
+
+
+def _data_shape(data):
+    """Number of instances and variables of a container"""
+    if isinstance(data, ak.highlevel.Array):
+        return len(data), len(data[0]) if len(data) > 0 else 0
+    return data.shape[0], data.shape[1]
+
+
+def _compose(n, slices):
+    """Compose slices of a sequence of known length n into a range"""
+    selection = range(n)
+    for s in slices:
+        selection = selection[s]
+    return selection
+
+
+def _to_slice(selection):
+    """Slice equivalent to a range"""
+    if len(selection) == 0:
+        return slice(0, 0)
+    stop = selection.stop
+    if stop < 0:
+        # a negative stop of a range with negative step means "past the
+        # beginning", which slices express with None
+        stop = None
+    return slice(selection.start, stop, selection.step)
+
+
+def _compose_clipped(first, second):
+    """Compose two positional time slices of series of unknown length into
+    one, or return None if their composition depends on the length
+
+    Slices with unit step and non-negative bounds compose independently of
+    the series length, as both clip to the end of the series.
+    """
+    bounds = (first.start, first.stop, second.start, second.stop)
+    if first.step not in (None, 1) or second.step not in (None, 1) or \
+            any(bound is not None and bound < 0 for bound in bounds):
+        return None
+    offset = first.start or 0
+    start = offset + (second.start or 0)
+    stops = [stop for stop in (first.stop, None if second.stop is None
+                               else offset + second.stop)
+             if stop is not None]
+    return slice(start, min(stops) if stops else None)
+
+
+def _slice_time(x, time):
+    """Apply time slices in order to a single series"""
+    for s in time:
+        x = x.iloc[s] if isinstance(x, pd.Series) else x[s]
+    return x
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = ["PhaseProfiler", "null_phase"]
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextlib import nullcontext
+
+_NULL_PHASE = nullcontext()
+
+
+def null_phase(name):
+    """Phase context used when profiling is disabled, which does nothing"""
+    return _NULL_PHASE
+
+
+class PhaseProfiler:
+    """Wall time and number of calls of named phases
+
+    Phases run in parallel threads are accumulated, so that the time of a
+    phase is the total time spent in it by all jobs.
+    """
+
+    def __init__(self):
+        self._times = OrderedDict()
+        self._calls = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """Context manager timing one call of a phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._times[name] = self._times.get(name, 0.0) + elapsed
+                self._calls[name] = self._calls.get(name, 0) + 1
+
+    @property
+    def stats(self):
+        """Time in seconds and number of calls of each phase, in the order
+        in which the phases were first entered"""
+        with self._lock:
+            return OrderedDict(
+                (name, {"time": self._times[name],
+                        "calls": self._calls[name]})
+                for name in self._times)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
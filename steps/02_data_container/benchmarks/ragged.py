@@ -0,0 +1,194 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = ["RaggedPanel"]
+
+import numpy as np
+
+from benchmarks.utils import _nested_to_buffers
+
+
+class RaggedPanel:
+    """Panel of possibly unequal-length series stored in flat buffers
+
+    All series are stored back to back in one values and one time index
+    buffer, ordered by instance and then variable, with the start of each
+    series given by offsets. Reductions over time are computed for all
+    series at once using np.add.reduceat.
+
+    Parameters
+    ----------
+    values : array of shape = [n_points]
+    times : array of shape = [n_points]
+    offsets : array of shape = [n_instances * n_variables + 1]
+        Start of each series in the buffers, the last entry marks the end
+        of the last series
+    n_variables : int
+    """
+
+    def __init__(self, values, times, offsets, n_variables):
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if (offsets.shape[0] - 1) % n_variables != 0:
+            raise ValueError("Number of series must be a multiple of "
+                             "n_variables")
+        self.values = np.asarray(values)
+        self.times = np.asarray(times)
+        self.offsets = offsets
+        self.n_variables = n_variables
+
+    @classmethod
+    def from_nested(cls, X):
+        """Construct from a nested pd.DataFrame"""
+        times, values, offsets, n_variables = _nested_to_buffers(X)
+        return cls(values, times, offsets, n_variables)
+
+    @classmethod
+    def from_3d_numpy(cls, X, time_index=None):
+        """Construct from a 3d numpy array of shape = [n_instances,
+        n_variables, n_timepoints]"""
+        n_instances, n_variables, n_timepoints = X.shape
+        if time_index is None:
+            time_index = np.arange(n_timepoints)
+        n_series = n_instances * n_variables
+        values = np.ascontiguousarray(X).ravel()
+        times = np.tile(np.asarray(time_index), n_series)
+        offsets = np.arange(0, n_series * n_timepoints + 1, n_timepoints)
+        return cls(values, times, offsets, n_variables)
+
+    @property
+    def shape(self):
+        """Number of instances and variables"""
+        return (self.offsets.shape[0] - 1) // self.n_variables, \
+            self.n_variables
+
+    @property
+    def lengths(self):
+        """Length of each series, of shape = [n_instances, n_variables]"""
+        return np.diff(self.offsets).reshape(self.shape)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.times.nbytes + self.offsets.nbytes
+
+    def __len__(self):
+        return self.shape[0]
+
+    def to_3d_numpy(self):
+        """Convert equal-length panels into a 3d numpy array"""
+        lengths = self.lengths
+        if lengths.size > 0 and np.any(lengths != lengths.flat[0]):
+            raise ValueError("Only panels of equal-length series can be "
+                             "converted into a 3d numpy array")
+        n_timepoints = lengths.flat[0] if lengths.size > 0 else 0
+        return self._points(self.values).reshape(
+            self.shape + (n_timepoints,))
+
+    def sum(self, axis=-1, dtype=None, out=None):
+        """Sum over time of each series"""
+        _check_axis(axis)
+        return _reduce(self._points(self.values), self.lengths, dtype=dtype,
+                       out=out)
+
+    def mean(self, axis=-1, dtype=None, out=None):
+        """Mean over time of each series, nan for empty series"""
+        _check_axis(axis)
+        lengths = self.lengths
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.divide(_reduce(self._points(self.values), lengths,
+                                     dtype=dtype), lengths, out=out)
+
+    def std(self, axis=-1, dtype=None, out=None, ddof=0):
+        """Standard deviation over time of each series, nan for empty
+        series"""
+        _check_axis(axis)
+        lengths = self.lengths
+        values = self._points(self.values)
+        means = self.mean(dtype=dtype)
+        # two-pass algorithm for numerical stability
+        deviations = values - np.repeat(means.ravel(), lengths.ravel())
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variance = _reduce(deviations * deviations, lengths,
+                               dtype=dtype) / (lengths - ddof)
+        return np.sqrt(variance, out=out)
+
+    def __getitem__(self, key):
+        """Slice instances, variables and time points
+
+        The time slice is positional and applied to each series separately,
+        so that series shorter than the slice are clipped as with
+        Python lists.
+        """
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) > 3:
+            raise IndexError("too many indices for RaggedPanel")
+        key = key + (slice(None),) * (3 - len(key))
+        instances, variables, time = key
+        if not isinstance(instances, slice) or \
+                not isinstance(variables, slice) or \
+                not isinstance(time, slice):
+            raise TypeError("RaggedPanel only supports slices")
+        if time.step not in (None, 1):
+            raise NotImplementedError("time slices with steps are not "
+                                      "supported")
+
+        series = np.arange(self.offsets.shape[0] - 1).reshape(self.shape)
+        series = series[instances, variables]
+        n_variables = series.shape[1]
+        series = series.ravel()
+
+        # start and end of each sliced series in the buffers
+        starts = self.offsets[series]
+        lengths = self.offsets[series + 1] - starts
+        begin = _normalise_bound(time.start, lengths, 0)
+        end = np.maximum(_normalise_bound(time.stop, lengths, lengths), begin)
+        starts = starts + begin
+        lengths = end - begin
+
+        offsets = np.zeros(series.shape[0] + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        index = np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1],
+                                                   lengths)
+        return RaggedPanel(self.values[index], self.times[index], offsets,
+                           n_variables)
+
+    def _points(self, buffer):
+        """Part of buffer covered by the offsets"""
+        return buffer[self.offsets[0]:self.offsets[-1]]
+
+
+def _check_axis(axis):
+    if axis not in (-1, 2):
+        raise NotImplementedError("RaggedPanel only supports reductions "
+                                  "over time")
+
+
+def _reduce(values, lengths, dtype=None, out=None):
+    """Sum of consecutive segments of values with the given lengths, zero
+    for empty segments"""
+    lengths = np.asarray(lengths)
+    flat_lengths = lengths.ravel()
+    starts = np.zeros(flat_lengths.shape[0], dtype=np.int64)
+    np.cumsum(flat_lengths[:-1], out=starts[1:])
+    if dtype is None:
+        dtype = np.result_type(values.dtype, np.float64)
+    sums = np.zeros(flat_lengths.shape[0], dtype=dtype)
+    # np.add.reduceat does not handle empty segments, which however do not
+    # change the segments of the remaining series
+    non_empty = flat_lengths > 0
+    if np.any(non_empty):
+        sums[non_empty] = np.add.reduceat(values, starts[non_empty],
+                                          dtype=dtype)
+    if out is None:
+        return sums.reshape(lengths.shape)
+    out[...] = sums.reshape(lengths.shape)
+    return out
+
+
+def _normalise_bound(bound, lengths, default):
+    """Per-series positional bound of a slice, clipped to [0, length]"""
+    if bound is None:
+        return np.broadcast_to(default, lengths.shape)
+    bound = np.where(bound < 0, lengths + bound, bound)
+    return np.clip(bound, 0, lengths)
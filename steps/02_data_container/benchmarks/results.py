@@ -0,0 +1,277 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = ["list_runs", "find_run", "load_run", "compare_runs"]
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+
+import numpy as np
+from sklearn.utils.validation import check_random_state
+
+STORAGE = ".benchmarks"
+
+# containers as they appear in the names of the benchmarks, mapped to one
+# name per container
+CONTAINERS = {
+    "ak_record": "ak_record",
+    "ak_3d": "ak_3d",
+    "np_3d": "np_3d",
+    "3d_np": "np_3d",
+    "3d_numpy": "np_3d",
+    "np": "np_3d",
+    "nested": "nested",
+    "tabularize": "tabularize",
+    "ragged": "ragged",
+    "long": "long",
+    "panel": "panel",
+    "dispatch": "dispatch",
+}
+
+
+def list_runs(storage=STORAGE):
+    """Paths of all runs saved by pytest-benchmark (--benchmark-autosave or
+    --benchmark-save), ordered by run number
+
+    Parameters
+    ----------
+    storage : str, optional (default=".benchmarks")
+
+    Returns
+    -------
+    paths : list of str
+    """
+    paths = glob.glob(os.path.join(storage, "*", "*.json"))
+    return sorted(paths, key=os.path.basename)
+
+
+def find_run(run, storage=STORAGE):
+    """Path of a run given its path or the prefix of its file name, e.g.
+    "0001" as for pytest-benchmark's --benchmark-compare"""
+    if os.path.isfile(run):
+        return run
+    matches = [path for path in list_runs(storage)
+               if os.path.basename(path).startswith(run)]
+    if len(matches) != 1:
+        raise ValueError(f"Found {len(matches)} runs matching {run!r} in "
+                         f"{storage!r}, expected exactly one")
+    return matches[0]
+
+
+def _key(benchmark):
+    """Align benchmarks by test function and parameters, which identify a
+    benchmark independently of the run"""
+    name = benchmark["fullname"].split("[")[0]
+    params = json.dumps(benchmark.get("params"), sort_keys=True,
+                        default=str)
+    return name, params
+
+
+def _subject(fullname, params):
+    """Estimator or operation and container of a benchmark, e.g. ("tsf",
+    "ak_record") for benchmarks/test_tsf.py::test_tsf_ak_record
+
+    The estimator is "tsf" for test functions named test_tsf_*, otherwise
+    the operation named by the test module, e.g. "mean" for test_mean.py.
+    The container is taken from the "container" parameter, if any, or
+    otherwise from the first container in `CONTAINERS` in the name of the
+    test function.
+    """
+    module, _, name = fullname.split("[")[0].rpartition("::")
+    name = name[len("test_"):] if name.startswith("test_") else name
+    estimator = os.path.splitext(os.path.basename(module))[0]
+    if name.startswith("tsf_"):
+        estimator = "tsf"
+    elif estimator.startswith("test_"):
+        estimator = estimator[len("test_"):]
+    if params and "container" in params:
+        return estimator, str(params["container"])
+    container, position = "other", len(name)
+    for alias, canonical in CONTAINERS.items():
+        match = re.search(rf"(?:^|_){alias}(?:_|$)", name)
+        if match is not None and match.start() < position:
+            container, position = canonical, match.start()
+    return estimator, container
+
+
+def load_run(path):
+    """Load a saved run
+
+    Returns
+    -------
+    run : dict
+        With the run's "datetime", "commit" id and "benchmarks", a dict
+        mapping (name, params) to the benchmark's "stats" and "data"; "data"
+        holds the per-round timings if the run was saved with
+        --benchmark-save-data, otherwise it is None
+    """
+    with open(path) as f:
+        run = json.load(f)
+    benchmarks = {}
+    for benchmark in run["benchmarks"]:
+        stats = dict(benchmark["stats"])
+        data = stats.pop("data", None)
+        benchmarks[_key(benchmark)] = {
+            "fullname": benchmark["fullname"],
+            "subject": _subject(benchmark["fullname"],
+                                benchmark.get("params")),
+            "group": benchmark.get("group"),
+            "extra_info": benchmark.get("extra_info", {}),
+            "stats": stats,
+            "data": None if data is None else np.asarray(data),
+        }
+    return {
+        "path": path,
+        "datetime": run.get("datetime"),
+        "commit": run.get("commit_info", {}).get("id"),
+        "benchmarks": benchmarks,
+    }
+
+
+def _ratio_interval(baseline, candidate, n_bootstrap, confidence, rng):
+    """Confidence interval of the ratio of candidate over baseline mean
+    time"""
+    alpha = (1 - confidence) / 2
+    if baseline["data"] is not None and candidate["data"] is not None:
+        # bootstrap the rounds of each run independently
+        b, c = baseline["data"], candidate["data"]
+        b = rng.choice(b, size=(n_bootstrap, b.shape[0])).mean(axis=1)
+        c = rng.choice(c, size=(n_bootstrap, c.shape[0])).mean(axis=1)
+        low, high = np.quantile(c / b, [alpha, 1 - alpha])
+        return low, high, "bootstrap"
+
+    # without per-round timings, fall back to a normal approximation of the
+    # log ratio from the summary statistics
+    from scipy.stats import norm
+
+    b, c = baseline["stats"], candidate["stats"]
+    se = np.sqrt((b["stddev"] / b["mean"]) ** 2 / b["rounds"]
+                 + (c["stddev"] / c["mean"]) ** 2 / c["rounds"])
+    z = norm.ppf(1 - alpha)
+    log_ratio = np.log(c["mean"] / b["mean"])
+    return np.exp(log_ratio - z * se), np.exp(log_ratio + z * se), "normal"
+
+
+def compare_runs(baseline, candidate, n_bootstrap=10000, confidence=0.95,
+                 random_state=None):
+    """Compare the benchmarks of a candidate run against a baseline run
+
+    Parameters
+    ----------
+    baseline, candidate : dict
+        Runs as returned by `load_run`
+    n_bootstrap : int, optional (default=10000)
+    confidence : float, optional (default=0.95)
+    random_state : int or RandomState, optional (default=None)
+
+    Returns
+    -------
+    report : list of dict
+        One row per benchmark in both runs with its estimator and container
+        (see `_subject`), the ratio of candidate over baseline mean time and
+        its confidence interval, grouped by estimator and container; within
+        each group, slowdowns come first, ordered from the largest, followed
+        by speedups, ordered from the largest, and benchmarks without a
+        significant change. Empty if the runs have no benchmarks in common.
+    """
+    rng = check_random_state(random_state)
+    report = []
+    for key in sorted(set(baseline["benchmarks"]) &
+                      set(candidate["benchmarks"])):
+        b = baseline["benchmarks"][key]
+        c = candidate["benchmarks"][key]
+        low, high, method = _ratio_interval(b, c, n_bootstrap, confidence,
+                                            rng)
+        if low > 1:
+            change = "slower"
+        elif high < 1:
+            change = "faster"
+        else:
+            change = "unchanged"
+        estimator, container = c["subject"]
+        report.append({
+            "name": c["fullname"],
+            "group": c["group"],
+            "estimator": estimator,
+            "container": container,
+            "baseline": b["stats"]["mean"],
+            "candidate": c["stats"]["mean"],
+            "ratio": c["stats"]["mean"] / b["stats"]["mean"],
+            "low": low,
+            "high": high,
+            "method": method,
+            "change": change,
+        })
+
+    order = {"slower": 0, "faster": 1, "unchanged": 2}
+    report.sort(key=lambda row: (
+        row["estimator"], row["container"], order[row["change"]],
+        -row["ratio"] if row["change"] == "slower" else row["ratio"]))
+    return report
+
+
+def _format_report(report, confidence):
+    header = (f"{'change':<10} {'ratio':>7} {int(confidence * 100)}% CI"
+              f"{'':<12} {'baseline (s)':>13} {'candidate (s)':>14}  name")
+    lines = []
+    subject = None
+    for row in report:
+        if (row["estimator"], row["container"]) != subject:
+            subject = row["estimator"], row["container"]
+            if lines:
+                lines.append("")
+            lines.extend([f"{subject[0]} / {subject[1]}", header])
+        interval = f"[{row['low']:.3f}, {row['high']:.3f}]"
+        lines.append(f"{row['change']:<10} {row['ratio']:>7.3f} "
+                     f"{interval:<18} {row['baseline']:>13.6f} "
+                     f"{row['candidate']:>14.6f}  {row['name']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="List saved benchmark runs or compare a run against a "
+                    "baseline run")
+    parser.add_argument("--storage", default=STORAGE)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="list saved runs")
+    compare = subparsers.add_parser(
+        "compare", help="compare a run against a baseline run")
+    compare.add_argument("baseline", help="path or run number, e.g. 0001")
+    compare.add_argument("candidate", help="path or run number, e.g. 0002")
+    compare.add_argument("--n-bootstrap", type=int, default=10000)
+    compare.add_argument("--confidence", type=float, default=0.95)
+    compare.add_argument("--random-state", type=int, default=0)
+    compare.add_argument("--output", help="write the report to this JSON "
+                                          "file")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for path in list_runs(args.storage):
+            run = load_run(path)
+            print(f"{path}  {run['datetime']}  {run['commit']}  "
+                  f"{len(run['benchmarks'])} benchmarks")
+        return
+
+    baseline = load_run(find_run(args.baseline, args.storage))
+    candidate = load_run(find_run(args.candidate, args.storage))
+    report = compare_runs(baseline, candidate, n_bootstrap=args.n_bootstrap,
+                          confidence=args.confidence,
+                          random_state=args.random_state)
+    if report:
+        print(_format_report(report, args.confidence))
+    else:
+        print(f"No benchmarks in common between {baseline['path']} and "
+              f"{candidate['path']}, nothing to compare", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
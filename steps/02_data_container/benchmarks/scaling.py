@@ -0,0 +1,140 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = ["load_scaling_results", "fit_exponents", "plot_scaling"]
+
+import argparse
+import json
+from collections import defaultdict
+
+import numpy as np
+
+
+def load_scaling_results(path):
+    """Load the scaling benchmarks from a pytest-benchmark JSON file
+
+    Parameters
+    ----------
+    path : str
+        JSON file written with --benchmark-json or --benchmark-autosave
+
+    Returns
+    -------
+    results : list of dict
+        One dict per benchmark with the operation, container, swept
+        parameter, its value ("size") and the timing statistics in seconds
+    """
+    with open(path) as f:
+        benchmarks = json.load(f)["benchmarks"]
+    results = []
+    for benchmark in benchmarks:
+        info = benchmark["extra_info"]
+        if "operation" not in info:
+            continue
+        stats = benchmark["stats"]
+        results.append({
+            "operation": info["operation"],
+            "container": info["container"],
+            "param": info["param"],
+            "size": info[info["param"]],
+            "mean": stats["mean"],
+            "median": stats["median"],
+            "min": stats["min"],
+            "stddev": stats["stddev"],
+        })
+    return results
+
+
+def _group(results):
+    groups = defaultdict(list)
+    for result in results:
+        key = (result["operation"], result["param"], result["container"])
+        groups[key].append(result)
+    return {key: sorted(group, key=lambda result: result["size"])
+            for key, group in groups.items()}
+
+
+def fit_exponents(results, statistic="median"):
+    """Fit time = c * size ** exponent for each operation, swept parameter
+    and container by least squares on the log-log scale
+
+    Parameters
+    ----------
+    results : list of dict
+        As returned by `load_scaling_results`
+    statistic : str, optional (default="median")
+
+    Returns
+    -------
+    exponents : list of dict
+    """
+    exponents = []
+    for (operation, param, container), group in _group(results).items():
+        sizes = np.array([result["size"] for result in group], dtype=float)
+        times = np.array([result[statistic] for result in group])
+        if np.unique(sizes).shape[0] < 2:
+            continue
+        exponent, intercept = np.polyfit(np.log(sizes), np.log(times), 1)
+        exponents.append({
+            "operation": operation,
+            "param": param,
+            "container": container,
+            "exponent": exponent,
+            "constant": np.exp(intercept),
+            "sizes": sizes.tolist(),
+            "times": times.tolist(),
+        })
+    return exponents
+
+
+def plot_scaling(results, path, statistic="median"):
+    """Plot time against size on log-log axes, one panel per operation and
+    swept parameter and one line per container"""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    groups = _group(results)
+    panels = sorted({(operation, param) for operation, param, _ in groups})
+    fig, axes = plt.subplots(1, len(panels), squeeze=False,
+                             figsize=(4 * len(panels), 4))
+    for ax, (operation, param) in zip(axes[0], panels):
+        for (o, p, container), group in sorted(groups.items()):
+            if (o, p) != (operation, param):
+                continue
+            ax.loglog([result["size"] for result in group],
+                      [result[statistic] for result in group],
+                      marker="o", label=container)
+        ax.set(title=operation, xlabel=param, ylabel=f"{statistic} time (s)")
+        ax.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fit complexity exponents to scaling benchmarks")
+    parser.add_argument("results", help="pytest-benchmark JSON file")
+    parser.add_argument("--statistic", default="median")
+    parser.add_argument("--output", help="write exponents to this JSON file")
+    parser.add_argument("--plot", help="save scaling curves to this file")
+    args = parser.parse_args(argv)
+
+    results = load_scaling_results(args.results)
+    exponents = fit_exponents(results, statistic=args.statistic)
+    print(f"{'operation':<10} {'param':<14} {'container':<10} exponent")
+    for row in exponents:
+        print(f"{row['operation']:<10} {row['param']:<14} "
+              f"{row['container']:<10} {row['exponent']:.2f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(exponents, f, indent=2)
+    if args.plot:
+        plot_scaling(results, args.plot, statistic=args.statistic)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = ["save_model", "load_model"]
+
+import json
+import numbers
+import os
+
+import numpy as np
+
+from benchmarks import tsf
+from benchmarks.packed import PackedForest
+
+# A saved model is a directory with a JSON header holding the estimator
+# class, its parameters and fitted scalars, and one .npy file per array:
+# the intervals, the classes and the node arrays of the packed forest.
+# Arrays are memory-mapped on loading, so that worker processes loading
+# the same model share one copy of it in the page cache.
+HEADER_FILE = "header.json"
+FOREST_ARRAYS = ("column", "threshold", "left", "right", "value", "roots")
+
+# parameters restored on loading, the cache is not saved
+PARAMS = ("random_state", "min_interval", "n_estimators", "shared_intervals",
+          "n_jobs", "batch_size", "seed_streams")
+
+
+def save_model(path, estimator):
+    """Save a fitted TimeSeriesForest as contiguous arrays
+
+    Parameters
+    ----------
+    path : str
+        Directory of the model, created if it does not exist
+    estimator : fitted TimeSeriesForest from `tsf`
+    """
+    estimator.check_is_fitted()
+    forest = estimator._packed_forest
+    if forest is None:
+        forest = PackedForest.from_trees(estimator.classifiers)
+
+    random_state = estimator.random_state
+    if isinstance(random_state, numbers.Integral):
+        # including numpy integers, which JSON does not serialise
+        random_state = int(random_state)
+    elif random_state is not None:
+        # RandomState instances only matter for fitting, not for predicting
+        random_state = None
+    params = {name: getattr(estimator, name) for name in PARAMS}
+    params.update(random_state=random_state,
+                  dtype=np.dtype(estimator.dtype).str)
+    if isinstance(estimator, tsf.TimeSeriesForest_dispatch):
+        params["kernel"] = estimator.kernel
+
+    classes = _label_array(estimator.classes_)
+
+    os.makedirs(path, exist_ok=True)
+    header = {
+        "class": type(estimator).__name__,
+        "params": params,
+        "n_classes": int(estimator.n_classes),
+        "n_variables": int(estimator.n_variables),
+        "series_length": int(estimator.series_length),
+        "n_intervals": int(estimator.n_intervals),
+        "max_depth": int(forest.max_depth),
+    }
+    with open(os.path.join(path, HEADER_FILE), "w") as f:
+        json.dump(header, f)
+    arrays = {name: getattr(forest, name) for name in FOREST_ARRAYS}
+    arrays.update(intervals=estimator.intervals, classes=classes)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"),
+                np.ascontiguousarray(array))
+
+
+def _label_array(classes):
+    """Class labels as an array that can be saved without pickling, with
+    the labels of the same type as the original ones
+
+    Object arrays can only be pickled, not memory-mapped, so they are
+    converted to the numeric, boolean or string dtype of their labels.
+
+    Raises
+    ------
+    ValueError
+        If the labels have no such dtype, e.g. labels of mixed types
+    """
+    classes = np.asarray(classes)
+    if classes.dtype != object:
+        return classes
+    labels = [label.item() if isinstance(label, np.generic) else label
+              for label in classes]
+    types = [type(label) for label in labels]
+    converted = np.array(labels)
+    if converted.dtype == object or \
+            [type(label) for label in converted.tolist()] != types:
+        raise ValueError(
+            f"Only class labels of one numeric, boolean or string type can "
+            f"be saved, found labels of types "
+            f"{sorted({label_type.__name__ for label_type in types})}")
+    return converted
+
+
+def load_model(path, mmap_mode="r"):
+    """Load a model saved with `save_model` for prediction
+
+    The loaded estimator scores the packed forest, it has no
+    DecisionTreeClassifier objects and cannot be refitted with warm_start.
+
+    Parameters
+    ----------
+    path : str
+    mmap_mode : str, optional (default="r")
+        Mode of np.load, None reads the arrays into memory
+
+    Returns
+    -------
+    estimator : fitted TimeSeriesForest
+    """
+    with open(os.path.join(path, HEADER_FILE)) as f:
+        header = json.load(f)
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"),
+                            mmap_mode=mmap_mode)
+              for name in FOREST_ARRAYS + ("intervals", "classes")}
+
+    params = header["params"]
+    params["dtype"] = np.dtype(params["dtype"]).type
+    estimator = getattr(tsf, header["class"])(packed=True, **params)
+    estimator.n_classes = header["n_classes"]
+    estimator.n_variables = header["n_variables"]
+    estimator.series_length = header["series_length"]
+    estimator.n_intervals = header["n_intervals"]
+    estimator.intervals = arrays.pop("intervals")
+    estimator.classes_ = arrays.pop("classes")
+    estimator._packed_forest = PackedForest(max_depth=header["max_depth"],
+                                            **arrays)
+    estimator._is_fitted = True
+    return estimator
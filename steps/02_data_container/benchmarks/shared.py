@@ -0,0 +1,82 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = ["SharedArray", "share_array", "open_shared"]
+
+import mmap
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+
+# memory-backed file system on Linux, so that shared arrays never touch
+# the disk; elsewhere they are written to the default temporary directory
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+class SharedArray:
+    """Descriptor of a numpy array in a memory-mapped file, which worker
+    processes can open without the array being pickled
+
+    Parameters
+    ----------
+    filename : str
+    dtype : str
+    shape : tuple of ints
+    offset : int, optional (default=0)
+        Position of the array in the file in bytes
+    """
+
+    def __init__(self, filename, dtype, shape, offset=0):
+        self.filename = filename
+        self.dtype = dtype
+        self.shape = tuple(shape)
+        self.offset = offset
+
+    def open(self):
+        """Memory-map the array read-only"""
+        return np.memmap(self.filename, dtype=self.dtype, mode="r",
+                         shape=self.shape, offset=self.offset)
+
+
+@contextmanager
+def share_array(X):
+    """Make a numpy array available to worker processes
+
+    Memory-mapped arrays which are not views, e.g. panels loaded with
+    `disk.load_panel`, are shared through their own file. Other arrays are
+    copied once into a temporary file in shared memory, which is removed
+    on exit.
+
+    Parameters
+    ----------
+    X : numpy array
+
+    Yields
+    ------
+    shared : SharedArray
+    """
+    if isinstance(X, np.memmap) and isinstance(X.base, mmap.mmap) and \
+            X.flags.c_contiguous:
+        yield SharedArray(X.filename, X.dtype.str, X.shape, X.offset)
+        return
+
+    path = tempfile.mkdtemp(prefix="tsf-", dir=SHARED_DIR)
+    try:
+        filename = os.path.join(path, "data.bin")
+        data = np.memmap(filename, dtype=X.dtype, mode="w+", shape=X.shape)
+        data[...] = X
+        data.flush()
+        del data
+        yield SharedArray(filename, X.dtype.str, X.shape)
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def open_shared(X):
+    """Open X in a worker if it is a SharedArray, otherwise return it
+    unchanged"""
+    return X.open() if isinstance(X, SharedArray) else X
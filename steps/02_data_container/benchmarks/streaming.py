@@ -0,0 +1,255 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = ["StreamingForest"]
+
+import numpy as np
+
+from benchmarks.packed import PackedForest
+from benchmarks.tsf import _cumulative_sums
+
+
+class StreamingForest:
+    """Sliding-window classification of live streams with a fitted
+    TimeSeriesForest
+
+    Each stream keeps the running sums of x, x ** 2 and t * x over its
+    recent points, as in `tsf._cumulative_sums`. Appending a point extends
+    the running sums in constant time, and points expire by moving the
+    start of the window forward, so that the sums of any interval of the
+    current window, and hence its mean, standard deviation and slope, are
+    the difference of two running sums. Scoring the windows reads the
+    features of all intervals from the running sums without going back to
+    the data.
+
+    The running sums cover up to 2 * series_length points. When they are
+    full, they are recomputed from the current window, centred on its
+    mean, which costs O(series_length) every series_length points and
+    keeps the sums numerically stable over long streams.
+
+    Parameters
+    ----------
+    estimator : fitted TimeSeriesForest from `tsf`
+    n_streams : int, optional (default=1)
+    """
+
+    def __init__(self, estimator, n_streams=1):
+        estimator.check_is_fitted()
+        self.estimator = estimator
+        self.n_streams = n_streams
+        self.n_variables = estimator.n_variables
+        self.series_length = estimator.series_length
+        self.dtype = estimator.dtype
+
+        # intervals, variables and trees in the order of the features in
+        # `tsf._BaseTimeSeriesForest._extract_features`
+        intervals = np.asarray(estimator.intervals)
+        if estimator.shared_intervals:
+            shape = intervals.shape[:-1] + (self.n_variables,)
+            intervals = np.broadcast_to(intervals[..., np.newaxis, :],
+                                        shape + (2,))
+            variables = np.arange(self.n_variables)
+        else:
+            shape = intervals.shape[:-1]
+            variables = np.arange(self.n_variables)[:, np.newaxis]
+        self._starts = intervals[..., 0].ravel()
+        self._ends = intervals[..., 1].ravel()
+        self._variables = np.broadcast_to(variables, shape).ravel()
+        self._n_trees = intervals.shape[0]
+        # time-invariant terms of the features, as in
+        # `tsf._interval_features`
+        lengths = self._ends - self._starts
+        self._lengths = lengths.astype(np.float64)
+        self._t_means = self._starts + (lengths - 1) / 2
+        self._t_vars = (lengths ** 2 - 1) / 12
+
+        self._forest = estimator._packed_forest
+        if self._forest is None:
+            self._forest = PackedForest.from_trees(estimator.classifiers)
+        self.reset()
+
+    def reset(self, streams=None):
+        """Discard the points of some or all streams
+
+        Parameters
+        ----------
+        streams : array-like of ints, optional (default=None)
+            Streams to reset, None resets all streams
+        """
+        if streams is None:
+            capacity = 2 * self.series_length
+            self._values = np.zeros((self.n_streams, self.n_variables,
+                                     capacity), dtype=self.dtype)
+            # in double precision whatever the dtype, as in
+            # `tsf._cumulative_sums`
+            self._sums = np.zeros((3, self.n_streams, self.n_variables,
+                                   capacity + 1))
+            self._offset = np.zeros((self.n_streams, self.n_variables))
+            # start of the window in the running sums
+            self._start = np.zeros(self.n_streams, dtype=np.intp)
+            self._n_points = np.zeros(self.n_streams, dtype=np.intp)
+            return
+        streams = np.asarray(streams)
+        self._start[streams] = 0
+        self._n_points[streams] = 0
+
+    @property
+    def ready(self):
+        """Whether the window of each stream is full, so that it can be
+        scored"""
+        return self._n_points >= self.series_length
+
+    def update(self, X, streams=None):
+        """Append points to some or all streams, expiring their oldest
+        points once the windows are full
+
+        Parameters
+        ----------
+        X : array of shape = [n_selected_streams, n_variables, n_points]
+        streams : array-like of ints, optional (default=None)
+            Streams the points belong to, None for all streams
+
+        Returns
+        -------
+        self : object
+        """
+        streams = np.arange(self.n_streams) if streams is None \
+            else np.asarray(streams)
+        X = np.asarray(X, dtype=self.dtype)
+        if X.shape[:2] != (streams.shape[0], self.n_variables):
+            raise ValueError(
+                f"X must have shape (n_selected_streams={streams.shape[0]}, "
+                f"n_variables={self.n_variables}, n_points), but found "
+                f"{X.shape}")
+        # points that fill the windows of all streams are written at once
+        n_missing = self.series_length - self._n_points[streams]
+        n_fill = max(0, min(X.shape[2], np.min(n_missing,
+                                               initial=X.shape[2])))
+        if n_fill > 0:
+            positions = self._n_points[streams, np.newaxis] \
+                + np.arange(n_fill)
+            self._values[streams[:, np.newaxis, np.newaxis],
+                         np.arange(self.n_variables)[:, np.newaxis],
+                         positions[:, np.newaxis]] = X[..., :n_fill]
+            self._n_points[streams] += n_fill
+            self._rebase(streams[self.ready[streams]])
+        for t in range(n_fill, X.shape[2]):
+            self._append(X[..., t], streams)
+        return self
+
+    def predict_proba(self, streams=None):
+        """Class probabilities of the current window of each stream, the
+        same as from predict_proba of the estimator on the windows
+
+        Parameters
+        ----------
+        streams : array-like of ints, optional (default=None)
+            Streams to score, None for all streams
+
+        Returns
+        -------
+        output : array of shape = [n_selected_streams, n_classes]
+        """
+        streams = np.arange(self.n_streams) if streams is None \
+            else np.asarray(streams)
+        if not np.all(self.ready[streams]):
+            raise ValueError(
+                f"Streams {streams[~self.ready[streams]].tolist()} have "
+                f"fewer than series_length={self.series_length} points")
+        streams = streams[:, np.newaxis]
+
+        def features(rows, columns):
+            # column of the feature in the flattened features of all trees,
+            # which has 3 features per interval
+            features = self._features(streams[rows[:, 0]], columns // 3)
+            return np.take_along_axis(features, (columns % 3)[..., np.newaxis],
+                                      axis=-1)[..., 0]
+
+        # only the features on the path of each stream through each tree
+        # are computed
+        leaves = self._forest.apply_lazy(features, streams.shape[0])
+        proba = self._forest.value[leaves]
+        return proba.sum(axis=1) / self._n_trees
+
+    def predict(self, streams=None):
+        """Class of the current window of each stream"""
+        proba = self.predict_proba(streams)
+        return np.asarray(self.estimator.classes_)[np.argmax(proba, axis=1)]
+
+    def _append(self, x, streams):
+        """Append one point to each of the given streams"""
+        full = self.ready[streams]
+        filling = streams[~full]
+        if filling.shape[0] > 0:
+            self._values[filling, :, self._n_points[filling]] = x[~full]
+            self._n_points[filling] += 1
+            # the running sums start once the window is full
+            self._rebase(filling[self.ready[filling]])
+
+        sliding = streams[full]
+        if sliding.shape[0] == 0:
+            return
+        x = x[full]
+        self._rebase(sliding[self._start[sliding] == self.series_length])
+        end = self._start[sliding] + self.series_length
+        self._values[sliding, :, end] = x
+        xc = x - self._offset[sliding]
+        for k, term in enumerate([xc, xc * xc, end[:, np.newaxis] * xc]):
+            self._sums[k, sliding, :, end + 1] = \
+                self._sums[k, sliding, :, end] + term
+        # the oldest point expires
+        self._start[sliding] += 1
+        self._n_points[sliding] += 1
+
+    def _rebase(self, streams):
+        """Move the current windows to the start of the buffers and
+        recompute their running sums, centred on their means"""
+        if streams.shape[0] == 0:
+            return
+        positions = self._start[streams, np.newaxis] \
+            + np.arange(self.series_length)
+        windows = self._values[streams[:, np.newaxis, np.newaxis],
+                               np.arange(self.n_variables)[:, np.newaxis],
+                               positions[:, np.newaxis]]
+        sums, offset = _cumulative_sums(windows)
+        self._values[streams, :, :self.series_length] = windows
+        self._sums[:, streams, :, :self.series_length + 1] = sums
+        self._offset[streams] = offset
+        self._start[streams] = 0
+
+    def _features(self, streams, intervals=slice(None)):
+        """Mean, standard deviation and slope of intervals of the current
+        windows from the running sums, as in `tsf._interval_features`
+
+        Parameters
+        ----------
+        streams : array of shape = [n_selected_streams, 1]
+        intervals : array of shape = [n_selected_streams, n], optional
+            Indices of the intervals of each stream in the flattened
+            intervals of all trees, defaults to all intervals
+
+        Returns
+        -------
+        features : array of shape = [n_selected_streams, n, 3]
+        """
+        start = self._start[streams]
+        variables = self._variables[intervals]
+        # gather from the flattened sums, which is faster than indexing
+        # three axes at once
+        series = (streams * self.n_variables + variables) \
+            * self._sums.shape[-1] + start
+        sums = self._sums.reshape(3, -1)
+        totals = (np.take(sums, series + self._ends[intervals], axis=1)
+                  - np.take(sums, series + self._starts[intervals], axis=1))
+        lengths = self._lengths[intervals]
+        means = totals[0] / lengths
+        std_dev = np.sqrt(np.maximum(totals[1] / lengths - means ** 2, 0))
+        # the running sums are against their own time index, which is the
+        # time index of the window shifted by its start
+        t_mean = self._t_means[intervals] + start
+        slope = (totals[2] / lengths - t_mean * means) \
+            / self._t_vars[intervals]
+        means += self._offset[streams, variables]
+        return np.stack([means, std_dev, slope], axis=-1).astype(
+            self.dtype, copy=False)
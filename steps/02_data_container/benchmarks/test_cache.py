@@ -0,0 +1,82 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = []
+
+import numpy as np
+import pytest
+
+from benchmarks.cache import IntervalFeatureCache
+from benchmarks.cache import fingerprint
+from benchmarks.tsf import TimeSeriesForest_3d_np
+
+rng = np.random.RandomState(0)
+X = rng.normal(size=(200, 5, 300))
+y = rng.randint(0, 2, size=200)
+X[y == 1] += np.linspace(0, 1, 300)
+
+
+def test_cache_lru_eviction():
+    cache = IntervalFeatureCache(max_bytes=3 * 80)
+    for key in range(3):
+        cache.put(key, np.zeros(10))
+    assert cache.get(0) is not None  # 0 is now most recently used
+    cache.put(3, np.zeros(10))
+    assert cache.get(1) is None
+    assert all(cache.get(key) is not None for key in (0, 2, 3))
+    assert cache.stats == {"hits": 4, "misses": 1, "hit_rate": 0.8,
+                           "evictions": 1, "n_entries": 3, "nbytes": 240}
+    # entries larger than the budget are not cached
+    cache.put(4, np.zeros(100))
+    assert cache.get(4) is None
+
+
+def test_fingerprint():
+    assert fingerprint(X) == fingerprint(X.copy())
+    assert fingerprint(X) != fingerprint(X[:-1])
+    assert fingerprint(X) != fingerprint(X.astype(np.float32))
+    Xt = X.copy()
+    Xt[0, 0, 0] += 1
+    assert fingerprint(X) != fingerprint(Xt)
+
+
+def _search(n_estimators_grid, cached):
+    # refit with the same random state but a growing number of trees, as
+    # in a hyperparameter search, so that later fits draw the intervals of
+    # the earlier ones first
+    cache = IntervalFeatureCache() if cached else None
+    probas = [TimeSeriesForest_3d_np(n_estimators=n_estimators,
+                                     random_state=1, cache=cache)
+              .fit(X, y).predict_proba(X)
+              for n_estimators in n_estimators_grid]
+    return probas, cache
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_tsf_repeated_fits(benchmark, cached):
+    benchmark.group = "tsf_repeated_fits"
+    n_estimators_grid = [25, 50, 100, 200]
+    actual, cache = benchmark(_search, n_estimators_grid, cached)
+
+    expected, _ = _search(n_estimators_grid, False)
+    for proba, expected_proba in zip(actual, expected):
+        np.testing.assert_array_equal(proba, expected_proba)
+    if cached:
+        benchmark.extra_info.update(cache.stats)
+        assert cache.stats["hit_rate"] > 0.5
+
+
+def test_tsf_cache_separate_intervals():
+    # intervals drawn for each variable only cache their own variable
+    params = {"n_estimators": 20, "random_state": 1,
+              "shared_intervals": False}
+    expected = TimeSeriesForest_3d_np(**params).fit(X, y).predict_proba(X)
+    cache = IntervalFeatureCache()
+    for _ in range(2):
+        estimator = TimeSeriesForest_3d_np(cache=cache, **params)
+        np.testing.assert_array_equal(estimator.fit(X, y).predict_proba(X),
+                                      expected)
+    assert cache.stats["hit_rate"] > 0.5
+    assert len(cache) <= estimator.intervals[..., 0].size
+    assert cache.nbytes == len(cache) * X.shape[0] * 3 * X.itemsize
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = []
+
+import numpy as np
+import pandas as pd
+import pytest
+from sktime.utils._testing.series_as_features import \
+    make_classification_problem
+from sktime.utils.data_container import nested_to_3d_numpy
+from sktime.utils.data_container import tabularize
+
+from benchmarks.long import LongPanel
+from benchmarks.ragged import RaggedPanel
+from benchmarks.utils import _make_ak_array
+from benchmarks.utils import _nested_to_buffers
+from benchmarks.utils import ak_record_arr
+from benchmarks.utils import ak_record_from_buffers
+from benchmarks.utils import ak_record_to_buffers
+from benchmarks.utils import from_3d_numpy_to_nested
+from benchmarks.utils import from_nested_to_3d_numpy
+
+N_INSTANCES = 100
+N_POINTS = [10 ** 3, 10 ** 5, 10 ** 7]
+
+
+def _make_buffers(n_points, n_instances=N_INSTANCES):
+    n_timepoints = n_points // n_instances
+    times = np.tile(np.arange(n_timepoints), n_instances)
+    values = np.random.RandomState(0).normal(size=n_points)
+    offsets = np.arange(0, n_points + 1, n_timepoints)
+    return times, values, offsets, 1
+
+
+def _make_nested(times, values, offsets):
+    return pd.DataFrame(
+        {"var_0": [pd.Series(values[start:end], index=times[start:end])
+                   for start, end in zip(offsets[:-1], offsets[1:])]})
+
+
+def _assert_buffers_equal(actual, expected):
+    for a, e in zip(actual, expected):
+        np.testing.assert_array_equal(a, e)
+
+
+@pytest.mark.parametrize("n_points", N_POINTS)
+def test_ak_record_from_buffers(benchmark, n_points):
+    buffers = _make_buffers(n_points)
+    actual = benchmark(ak_record_from_buffers, *buffers)
+    _assert_buffers_equal(ak_record_to_buffers(actual), buffers)
+
+
+@pytest.mark.parametrize("n_points", N_POINTS)
+def test_ak_record_to_buffers(benchmark, n_points):
+    buffers = _make_buffers(n_points)
+    X = ak_record_from_buffers(*buffers)
+    actual = benchmark(ak_record_to_buffers, X)
+    _assert_buffers_equal(actual, buffers)
+
+
+@pytest.mark.parametrize("n_points", N_POINTS)
+def test_nested_to_buffers(benchmark, n_points):
+    buffers = _make_buffers(n_points)
+    X = _make_nested(*buffers[:-1])
+    actual = benchmark(_nested_to_buffers, X)
+    _assert_buffers_equal(actual, buffers)
+
+
+@pytest.mark.parametrize("n_points", N_POINTS)
+def test_nested_to_ak_record(benchmark, n_points):
+    buffers = _make_buffers(n_points)
+    X = _make_nested(*buffers[:-1])
+    actual = benchmark(ak_record_arr, X)
+    _assert_buffers_equal(ak_record_to_buffers(actual), buffers)
+
+
+@pytest.mark.parametrize("n_points", N_POINTS)
+def test_nested_to_ak_record_per_point(benchmark, n_points):
+    if n_points > 10 ** 5:
+        pytest.skip("building per-point records is too slow")
+    buffers = _make_buffers(n_points)
+    X = _make_nested(*buffers[:-1])
+    actual = benchmark(_make_ak_array, X)
+    _assert_buffers_equal(ak_record_to_buffers(actual), buffers)
+
+
+X, _ = make_classification_problem(n_instances=100,
+                                   n_timepoints=100,
+                                   n_columns=10)
+
+expected = nested_to_3d_numpy(X)
+
+
+def _tabularize_3d(X):
+    return tabularize(X, return_array=True).reshape(expected.shape)
+
+
+def test_nested_to_3d_numpy(benchmark):
+    actual = benchmark(from_nested_to_3d_numpy, X)
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_nested_to_3d_numpy_sktime(benchmark):
+    actual = benchmark(nested_to_3d_numpy, X)
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_nested_to_3d_numpy_tabularize(benchmark):
+    actual = benchmark(_tabularize_3d, X)
+    np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("copy", [True, False])
+def test_3d_numpy_to_nested(benchmark, copy):
+    actual = benchmark(from_3d_numpy_to_nested, expected, copy=copy)
+    np.testing.assert_array_equal(from_nested_to_3d_numpy(actual), expected)
+    assert np.shares_memory(actual.iloc[0, 0].to_numpy(), expected) != copy
+
+
+def test_3d_numpy_to_long(benchmark):
+    actual = benchmark(LongPanel.from_3d_numpy, expected)
+    np.testing.assert_array_equal(actual.to_3d_numpy(), expected)
+
+
+def test_long_to_3d_numpy(benchmark):
+    x = LongPanel.from_3d_numpy(expected)
+    actual = benchmark(x.to_3d_numpy)
+    np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("n_points", N_POINTS)
+def test_ragged_to_long(benchmark, n_points):
+    times, values, offsets, n_variables = _make_buffers(n_points)
+    x = RaggedPanel(values, times, offsets, n_variables)
+    actual = benchmark(LongPanel.from_ragged, x)
+    _assert_buffers_equal(
+        (actual.times, actual.values, actual.offsets, actual.n_variables),
+        (times, values, offsets, n_variables))
+
+
+@pytest.mark.parametrize("n_points", N_POINTS)
+def test_long_to_ragged(benchmark, n_points):
+    times, values, offsets, n_variables = _make_buffers(n_points)
+    x = LongPanel.from_ragged(RaggedPanel(values, times, offsets,
+                                          n_variables))
+    actual = benchmark(x.to_ragged)
+    _assert_buffers_equal(
+        (actual.times, actual.values, actual.offsets, actual.n_variables),
+        (times, values, offsets, n_variables))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = []
+
+import tracemalloc
+
+import numpy as np
+import pytest
+from sktime.utils._testing.series_as_features import \
+    make_classification_problem
+
+from benchmarks.disk import load_panel
+from benchmarks.disk import save_panel
+from benchmarks.tsf import TimeSeriesForest_3d_np
+from benchmarks.utils import np_3d_arr
+
+
+def _fit_predict(estimator, X_train, y_train, X_test):
+    return estimator.fit(X_train, y_train).predict_proba(X_test)
+
+
+PARAMS = {"n_estimators": 20, "random_state": 1}
+X, y = make_classification_problem(n_instances=2000, n_timepoints=500)
+X = np_3d_arr(X)
+
+expected = _fit_predict(TimeSeriesForest_3d_np(**PARAMS), X, y, X)
+
+
+@pytest.fixture(scope="module")
+def X_disk(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("panel"))
+    save_panel(path, X)
+    return load_panel(path)
+
+
+@pytest.mark.parametrize("on_disk, batch_size", [(False, None),
+                                                 (True, None),
+                                                 (True, 100)])
+def test_tsf_3d_np_disk(benchmark, X_disk, on_disk, batch_size):
+    benchmark.group = "tsf_disk"
+    x = X_disk if on_disk else X
+    estimator = TimeSeriesForest_3d_np(batch_size=batch_size, **PARAMS)
+    actual = benchmark(_fit_predict, estimator, x, y, x)
+    np.testing.assert_array_equal(actual, expected)
+
+    # peak memory is recorded by the benchmark fixture in conftest.py,
+    # there are no timings with --benchmark-disable
+    if benchmark.stats is not None:
+        benchmark.extra_info["instances_per_second"] = \
+            X.shape[0] / benchmark.stats.stats.mean
+
+
+def _peak_fit_memory(estimator, X, y):
+    tracemalloc.start()
+    try:
+        estimator.fit(X, y)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_tsf_3d_np_disk_memory(X_disk):
+    # with batches, fit only holds one batch of X and the features of one
+    # tree, memory-mapped data and features are not traced
+    peak = _peak_fit_memory(TimeSeriesForest_3d_np(**PARAMS), X_disk, y)
+    peak_batched = _peak_fit_memory(
+        TimeSeriesForest_3d_np(batch_size=100, **PARAMS), X_disk, y)
+    assert peak_batched < X.nbytes
+    assert peak_batched < peak / 4
+
+
+def test_tsf_3d_np_disk_batches(X_disk):
+    # each batch is prepared once for the features of all trees
+    batches = []
+
+    class _TimeSeriesForest(TimeSeriesForest_3d_np):
+        def _transformer(self, X):
+            batches.append(X.shape[0])
+            return super(_TimeSeriesForest, self)._transformer(X)
+
+    _TimeSeriesForest(batch_size=500, **PARAMS).fit(X_disk, y)
+    assert batches == [500] * 4
@@ -9,8 +9,11 @@ from sktime.utils._testing.series_as_features import \
     make_classification_problem
 from sktime.utils.data_container import tabularize
 
+from benchmarks.long import LongPanel
+from benchmarks.ragged import RaggedPanel
 from benchmarks.utils import ak_3d_arr
 from benchmarks.utils import ak_record_arr
+from benchmarks.utils import make_unequal_length
 from benchmarks.utils import np_3d_arr
 
 
@@ -26,10 +29,27 @@ def _nested_mean(X):
     return np.asarray([X.iloc[i, 0].mean() for i in range(X.shape[0])])
 
 
+def _groupby_mean(X):
+    # long-format table, as from a database
+    return X.groupby(["instance", "variable"])["value"].mean().to_numpy()
+
+
+def _long_mean(X):
+    return LongPanel.from_frame(X).mean()
+
+
 X, y = make_classification_problem(n_instances=100, n_columns=1, n_timepoints=100)
 
 expected = _mean(np_3d_arr(X))
 
+X_unequal = make_unequal_length(X, min_length=50, random_state=1)
+expected_unequal = _nested_mean(X_unequal).reshape(-1, 1)
+
+# long-format table as from a database, with rows ordered by time, so that
+# the series are interleaved
+X_long_unequal = LongPanel.from_nested(X_unequal).to_frame().sort_values(
+    "time", kind="stable")
+
 
 def test_ak_3d_mean(benchmark):
     x = ak_3d_arr(X)
@@ -57,3 +77,49 @@ def test_nested_mean(benchmark):
 def test_tabularize_mean(benchmark):
     actual = benchmark(_tabularize_mean, X)
     np.testing.assert_array_equal(expected, actual.reshape(-1, 1))
+
+
+def test_ragged_mean(benchmark):
+    x = RaggedPanel.from_nested(X)
+    actual = benchmark(_mean, x)
+    np.testing.assert_array_almost_equal(expected, actual)
+
+
+def test_ak_record_mean_unequal(benchmark):
+    x = ak_record_arr(X_unequal)
+    actual = benchmark(_mean, x)
+    np.testing.assert_array_almost_equal(expected_unequal, actual["value"])
+
+
+def test_nested_mean_unequal(benchmark):
+    actual = benchmark(_nested_mean, X_unequal)
+    np.testing.assert_array_equal(expected_unequal, actual.reshape(-1, 1))
+
+
+def test_ragged_mean_unequal(benchmark):
+    x = RaggedPanel.from_nested(X_unequal)
+    actual = benchmark(_mean, x)
+    np.testing.assert_array_almost_equal(expected_unequal, actual)
+
+
+def test_long_mean(benchmark):
+    x = LongPanel.from_nested(X)
+    actual = benchmark(_mean, x)
+    np.testing.assert_array_almost_equal(expected, actual)
+
+
+def test_long_mean_unequal(benchmark):
+    x = LongPanel.from_nested(X_unequal)
+    actual = benchmark(_mean, x)
+    np.testing.assert_array_almost_equal(expected_unequal, actual)
+
+
+def test_long_frame_groupby_mean_unequal(benchmark):
+    actual = benchmark(_groupby_mean, X_long_unequal)
+    np.testing.assert_array_almost_equal(expected_unequal,
+                                         actual.reshape(-1, 1))
+
+
+def test_long_frame_mean_unequal(benchmark):
+    actual = benchmark(_long_mean, X_long_unequal)
+    np.testing.assert_array_almost_equal(expected_unequal, actual)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = []
+
+import json
+import os
+
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+from benchmarks.results import compare_runs
+from benchmarks.results import find_run
+from benchmarks.results import list_runs
+from benchmarks.results import load_run
+from benchmarks.results import main
+
+MACHINE = "Linux-CPython-3.7-64bit"
+
+
+def _benchmark(fullname, data=None, mean=None, stddev=None, rounds=None,
+               params=None):
+    """Benchmark as saved by pytest-benchmark, with per-round timings if
+    data is given, otherwise only with summary statistics"""
+    if data is not None:
+        data = np.asarray(data)
+        mean, stddev, rounds = data.mean(), data.std(ddof=1), data.shape[0]
+    stats = {"mean": mean, "stddev": stddev, "rounds": rounds}
+    if data is not None:
+        stats["data"] = data.tolist()
+    return {"fullname": fullname, "group": None, "params": params,
+            "extra_info": {}, "stats": stats}
+
+
+def _save_run(storage, number, benchmarks):
+    directory = os.path.join(storage, MACHINE)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{number}_commit_20200923_142408.json")
+    with open(path, "w") as f:
+        json.dump({"datetime": "2020-09-23T14:24:16", "commit_info": {
+            "id": "commit"}, "benchmarks": benchmarks}, f)
+    return path
+
+
+rng = np.random.RandomState(0)
+TIMES = 1 + 0.01 * rng.normal(size=50)
+
+# baseline and candidate timings of benchmarks of two containers, whose
+# candidate is slower, faster or unchanged
+BASELINE = [
+    _benchmark("benchmarks/test_tsf.py::test_tsf_ak_3d", TIMES),
+    _benchmark("benchmarks/test_tsf.py::test_tsf_3_np", TIMES),
+    _benchmark("benchmarks/test_mean.py::test_np_mean", TIMES),
+    _benchmark("benchmarks/test_mean.py::test_ak_3d_mean", TIMES),
+    _benchmark("benchmarks/test_mean.py::test_nested_mean", TIMES),
+    _benchmark("benchmarks/test_slice.py::test_np_slice", TIMES),
+]
+CANDIDATE = [
+    _benchmark("benchmarks/test_tsf.py::test_tsf_ak_3d", 0.5 * TIMES),
+    _benchmark("benchmarks/test_tsf.py::test_tsf_3_np", 2 * TIMES),
+    _benchmark("benchmarks/test_mean.py::test_np_mean", 1.5 * TIMES),
+    _benchmark("benchmarks/test_mean.py::test_ak_3d_mean", 3 * TIMES),
+    _benchmark("benchmarks/test_mean.py::test_nested_mean", TIMES[::-1]),
+    _benchmark("benchmarks/test_mean.py::test_tabularize_mean", TIMES),
+]
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = str(tmp_path)
+    _save_run(storage, "0001", BASELINE)
+    _save_run(storage, "0002", CANDIDATE)
+    return storage
+
+
+def test_find_run(storage):
+    assert [os.path.basename(path)[:4] for path in list_runs(storage)] == [
+        "0001", "0002"]
+    assert find_run("0002", storage) == list_runs(storage)[1]
+    with pytest.raises(ValueError):
+        find_run("000", storage)
+
+
+def test_compare_runs_bootstrap(storage):
+    baseline = load_run(find_run("0001", storage))
+    candidate = load_run(find_run("0002", storage))
+    report = compare_runs(baseline, candidate, n_bootstrap=1000,
+                          random_state=0)
+
+    # only benchmarks in both runs, grouped by estimator and container, with
+    # slowdowns ranked before speedups and unchanged benchmarks
+    assert [(row["estimator"], row["container"], row["change"])
+            for row in report] == [
+        ("mean", "ak_3d", "slower"),
+        ("mean", "nested", "unchanged"),
+        ("mean", "np_3d", "slower"),
+        ("tsf", "ak_3d", "faster"),
+        ("tsf", "np_3d", "slower"),
+    ]
+    for row in report:
+        assert row["method"] == "bootstrap"
+        assert row["low"] <= row["ratio"] <= row["high"]
+    np.testing.assert_allclose([row["ratio"] for row in report],
+                               [3, 1, 1.5, 0.5, 2])
+    # the interval of the ratio of means is about +- 2 standard errors
+    se = np.sqrt(2 / 50) * TIMES.std() / TIMES.mean()
+    row = report[0]
+    np.testing.assert_allclose([row["low"], row["high"]],
+                               [3 * (1 - 1.96 * se), 3 * (1 + 1.96 * se)],
+                               rtol=1e-3)
+
+
+def test_compare_runs_ranking(storage):
+    baseline = load_run(find_run("0001", storage))
+    candidate = load_run(find_run("0002", storage))
+    # all mean benchmarks of one container, slowdowns from the largest,
+    # then speedups from the largest
+    for run in (baseline, candidate):
+        for benchmark in run["benchmarks"].values():
+            benchmark["subject"] = ("mean", "np_3d")
+    report = compare_runs(baseline, candidate, n_bootstrap=1000,
+                          random_state=0)
+    assert [row["ratio"] for row in report] == pytest.approx(
+        [3, 2, 1.5, 0.5, 1])
+
+
+def test_compare_runs_normal(tmp_path):
+    # runs saved without per-round timings
+    name = "benchmarks/test_tsf.py::test_tsf_3_np"
+    baseline = load_run(_save_run(str(tmp_path), "0001", [
+        _benchmark(name, mean=1.0, stddev=0.1, rounds=10)]))
+    candidate = load_run(_save_run(str(tmp_path), "0002", [
+        _benchmark(name, mean=1.2, stddev=0.2, rounds=20)]))
+    [row] = compare_runs(baseline, candidate, confidence=0.9)
+    assert row["method"] == "normal"
+    se = np.sqrt(0.1 ** 2 / 10 + (0.2 / 1.2) ** 2 / 20)
+    z = norm.ppf(0.95)
+    np.testing.assert_allclose([row["low"], row["high"]],
+                               1.2 * np.exp([-z * se, z * se]))
+    assert row["change"] == "slower"
+
+
+def test_results_cli(storage, tmp_path, capsys):
+    main(["--storage", storage, "list"])
+    assert "6 benchmarks" in capsys.readouterr().out
+
+    output = str(tmp_path / "report.json")
+    main(["--storage", storage, "compare", "0001", "0002", "--n-bootstrap",
+          "100", "--output", output])
+    out = capsys.readouterr().out
+    assert "mean / ak_3d" in out and "tsf / np_3d" in out
+    assert out.index("mean / ak_3d") < out.index("tsf / np_3d")
+    with open(output) as f:
+        assert len(json.load(f)) == 5
+
+    # runs without benchmarks in common are reported as such
+    _save_run(storage, "0003", [
+        _benchmark("benchmarks/test_slice.py::test_ak_3d_slice", TIMES)])
+    main(["--storage", storage, "compare", "0002", "0003"])
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "No benchmarks in common" in captured.err
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = []
+
+# Scaling benchmarks sweeping one size parameter at a time over orders of
+# magnitude, keeping the others at their base value. The sizes are stored
+# in the extra info of each benchmark, so that scaling curves and
+# complexity exponents can be computed from the saved results with
+# `python -m benchmarks.scaling <results.json>`.
+
+import json
+from functools import lru_cache
+
+import awkward1 as ak
+import numpy as np
+import pytest
+
+from benchmarks.ragged import RaggedPanel
+from benchmarks.scaling import fit_exponents
+from benchmarks.scaling import load_scaling_results
+from benchmarks.tsf import TimeSeriesForest_3d_np
+from benchmarks.tsf import TimeSeriesForest_ak_3d
+from benchmarks.tsf import TimeSeriesForest_ak_record
+from benchmarks.utils import ak_record_from_buffers
+from benchmarks.utils import from_3d_numpy_to_nested
+
+
+def _ak_record_arr(X):
+    x = RaggedPanel.from_3d_numpy(X)
+    return ak_record_from_buffers(x.times, x.values, x.offsets,
+                                  x.n_variables)
+
+
+CONTAINERS = {
+    "np_3d": lambda X: X,
+    "ak_3d": ak.Array,
+    "ak_record": _ak_record_arr,
+    "nested": from_3d_numpy_to_nested,
+    "ragged": RaggedPanel.from_3d_numpy,
+}
+
+ESTIMATORS = {
+    "np_3d": TimeSeriesForest_3d_np,
+    "ak_3d": TimeSeriesForest_ak_3d,
+    "ak_record": TimeSeriesForest_ak_record,
+}
+
+
+def _sweep(base, sweeps):
+    for param, values in sweeps.items():
+        for value in values:
+            sizes = dict(base, **{param: value})
+            yield pytest.param(param, sizes, id=f"{param}={value}")
+
+
+CONTAINER_BASE = {"n_instances": 100, "n_columns": 1, "n_timepoints": 100}
+CONTAINER_SWEEPS = {
+    "n_instances": [10, 100, 1000, 10000],
+    "n_columns": [1, 10, 100],
+    "n_timepoints": [10, 100, 1000, 10000],
+}
+TSF_BASE = {"n_instances": 100, "n_columns": 1, "n_timepoints": 100,
+            "n_estimators": 10}
+TSF_SWEEPS = {
+    "n_instances": [100, 1000, 10000],
+    "n_columns": [1, 10, 100],
+    "n_timepoints": [100, 1000, 10000],
+    "n_estimators": [1, 10, 100, 1000],
+}
+
+
+@lru_cache(maxsize=1)
+def _make_data(n_instances, n_columns, n_timepoints):
+    rng = np.random.RandomState(0)
+    X = rng.normal(size=(n_instances, n_columns, n_timepoints))
+    y = rng.randint(0, 2, size=n_instances)
+    X[y == 1] += np.linspace(0, 1, n_timepoints)
+    return X, y
+
+
+def _time_slice(n_timepoints):
+    return slice(n_timepoints // 2, n_timepoints // 2 + n_timepoints // 10)
+
+
+def _mean(X):
+    if isinstance(X, np.ndarray):
+        return np.mean(X, axis=-1)
+    if isinstance(X, RaggedPanel):
+        return X.mean(axis=-1)
+    if isinstance(X, ak.highlevel.Array):
+        return np.mean(X, axis=-1)
+    return np.asarray([[X.iloc[i, j].mean() for j in range(X.shape[1])]
+                       for i in range(X.shape[0])])
+
+
+def _slice(X, time):
+    n_instances = len(X)
+    instances = slice(n_instances // 10, n_instances // 5 + 1)
+    if isinstance(X, (np.ndarray, RaggedPanel, ak.highlevel.Array)):
+        return X[instances, :, time]
+    x = X.iloc[instances]
+    return [[x.iloc[i, j].iloc[time].to_numpy() for j in range(x.shape[1])]
+            for i in range(x.shape[0])]
+
+
+def _record(benchmark, operation, container, param, sizes):
+    benchmark.group = f"scaling_{operation}_{param}"
+    benchmark.extra_info.update(operation=operation, container=container,
+                                param=param, **sizes)
+
+
+@pytest.mark.parametrize("container", CONTAINERS)
+@pytest.mark.parametrize("param, sizes",
+                         _sweep(CONTAINER_BASE, CONTAINER_SWEEPS))
+def test_scaling_mean(benchmark, container, param, sizes):
+    _record(benchmark, "mean", container, param, sizes)
+    X, _ = _make_data(**sizes)
+    x = CONTAINERS[container](X)
+    actual = benchmark(_mean, x)
+    if container == "ak_record":
+        actual = actual["value"]
+    np.testing.assert_array_almost_equal(np.asarray(actual), X.mean(axis=-1))
+
+
+@pytest.mark.parametrize("container", CONTAINERS)
+@pytest.mark.parametrize("param, sizes",
+                         _sweep(CONTAINER_BASE, CONTAINER_SWEEPS))
+def test_scaling_slice(benchmark, container, param, sizes):
+    _record(benchmark, "slice", container, param, sizes)
+    X, _ = _make_data(**sizes)
+    x = CONTAINERS[container](X)
+    time = _time_slice(sizes["n_timepoints"])
+    actual = benchmark(_slice, x, time)
+    if container == "ragged":
+        actual = actual.to_3d_numpy()
+    elif container == "ak_record":
+        actual = actual["value"]
+    n_instances = sizes["n_instances"]
+    expected = X[n_instances // 10:n_instances // 5 + 1, :, time]
+    np.testing.assert_array_equal(np.asarray(actual), expected)
+
+
+@pytest.mark.parametrize("container", ESTIMATORS)
+@pytest.mark.parametrize("param, sizes", _sweep(TSF_BASE, TSF_SWEEPS))
+def test_scaling_tsf(benchmark, container, param, sizes):
+    _record(benchmark, "tsf", container, param, sizes)
+    sizes = dict(sizes)
+    n_estimators = sizes.pop("n_estimators")
+    X, y = _make_data(**sizes)
+    x = CONTAINERS[container](X)
+    estimator = ESTIMATORS[container](n_estimators=n_estimators,
+                                      random_state=1)
+    benchmark(lambda: estimator.fit(x, y).predict_proba(x))
+
+
+def test_fit_exponents(tmp_path):
+    # saved results of synthetic timings, quadratic in the number of
+    # instances and linear in the series length, with multiplicative noise
+    rng = np.random.RandomState(0)
+    sweeps = {
+        "n_instances": (np.array([10, 100, 1000, 10000]), 2, 3e-8),
+        "n_timepoints": (np.array([10, 100, 1000, 10000]), 1, 2e-4),
+    }
+    benchmarks = []
+    for param, (sizes, exponent, constant) in sweeps.items():
+        for size in sizes:
+            time = constant * size ** exponent * np.exp(
+                rng.normal(scale=0.01))
+            benchmarks.append({
+                "extra_info": {"operation": "tsf", "container": "np_3d",
+                               "param": param, param: int(size)},
+                "stats": {"mean": time, "median": time, "min": time,
+                          "stddev": 0.0}})
+    # other benchmarks and sweeps of a single size are ignored
+    benchmarks.append({"extra_info": {}, "stats": {}})
+    benchmarks.append({
+        "extra_info": {"operation": "tsf", "container": "np_3d",
+                       "param": "n_estimators", "n_estimators": 10},
+        "stats": {"mean": 1.0, "median": 1.0, "min": 1.0, "stddev": 0.0}})
+    path = tmp_path / "results.json"
+    path.write_text(json.dumps({"benchmarks": benchmarks}))
+
+    exponents = fit_exponents(load_scaling_results(str(path)))
+    assert [row["param"] for row in exponents] == list(sweeps)
+    for row in exponents:
+        _, exponent, constant = sweeps[row["param"]]
+        assert row["exponent"] == pytest.approx(exponent, abs=0.02)
+        assert row["constant"] == pytest.approx(constant, rel=0.1)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = []
+
+import multiprocessing
+import os
+import pickle
+import time
+
+import numpy as np
+import pytest
+from sktime.utils._testing.series_as_features import \
+    make_classification_problem
+
+from benchmarks.serialize import load_model
+from benchmarks.serialize import save_model
+from benchmarks.tsf import TimeSeriesForest_3d_np
+from benchmarks.utils import np_3d_arr
+
+N_WORKERS = 4
+
+X, y = make_classification_problem(n_instances=200, n_timepoints=500)
+X = np_3d_arr(X)
+
+
+def _rss():
+    """Anonymous and file-backed resident memory of this process in bytes,
+    the latter is shared between processes mapping the same file"""
+    rss = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("RssAnon", "RssFile"):
+                rss[name] = int(value.split()[0]) * 1024
+    return rss
+
+
+def _load(path, loader):
+    if loader == "pickle":
+        with open(os.path.join(path, "model.pkl"), "rb") as f:
+            return pickle.load(f)
+    return load_model(path, mmap_mode="r" if loader == "mmap" else None)
+
+
+def _start_worker(path, loader, X):
+    """Load the model and score X, as an inference worker does on
+    startup, returning the load time and memory added by the model"""
+    before = _rss()
+    start = time.perf_counter()
+    estimator = _load(path, loader)
+    load_time = time.perf_counter() - start
+    proba = estimator.predict_proba(X)
+    after = _rss()
+    return proba, load_time, {name: after[name] - before[name]
+                              for name in after}
+
+
+@pytest.fixture(scope="module")
+def model(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("model"))
+    estimator = TimeSeriesForest_3d_np(n_estimators=200, random_state=1,
+                                       packed=True).fit(X, y)
+    save_model(path, estimator)
+    with open(os.path.join(path, "model.pkl"), "wb") as f:
+        pickle.dump(estimator, f)
+    return path, estimator.predict_proba(X)
+
+
+@pytest.mark.parametrize("loader", ["pickle", "npy", "mmap"])
+def test_tsf_load(benchmark, model, loader):
+    benchmark.group = "tsf_load"
+    path, expected = model
+    estimator = benchmark(_load, path, loader)
+    np.testing.assert_array_equal(estimator.predict_proba(X), expected)
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"),
+                    reason="requires /proc to measure memory")
+@pytest.mark.parametrize("loader", ["pickle", "mmap"])
+def test_tsf_load_workers(benchmark, model, loader):
+    benchmark.group = "tsf_load_workers"
+    path, expected = model
+
+    def start_workers():
+        # fresh processes, so that nothing is shared through fork
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(N_WORKERS) as pool:
+            return pool.starmap(_start_worker,
+                                [(path, loader, X)] * N_WORKERS)
+
+    results = benchmark.pedantic(start_workers, rounds=3)
+    for proba, _, _ in results:
+        np.testing.assert_array_equal(proba, expected)
+
+    # per-worker means, memory-mapped arrays are counted in RssFile
+    benchmark.extra_info["worker_load_time"] = np.mean(
+        [load_time for _, load_time, _ in results])
+    for name in ("RssAnon", "RssFile"):
+        benchmark.extra_info[f"worker_{name}"] = np.mean(
+            [rss[name] for _, _, rss in results])
+
+
+@pytest.mark.parametrize("labels", [[1, 2], ["a", "b"], [True, False]])
+def test_tsf_save_labels(tmp_path, labels):
+    # labels in object arrays, e.g. from pandas, keep their type, and
+    # integer seeds are kept
+    estimator = TimeSeriesForest_3d_np(n_estimators=5,
+                                       random_state=np.int64(1)).fit(
+        X, (y == y[0]).astype(int))
+    estimator.classes_ = np.asarray(labels, dtype=object)
+    save_model(str(tmp_path), estimator)
+    loaded = load_model(str(tmp_path))
+    assert loaded.random_state == 1
+    assert loaded.predict(X).tolist() == estimator.predict(X).tolist()
+    assert {type(label) for label in loaded.predict(X).tolist()} == {
+        type(labels[0])}
+
+    estimator.classes_ = np.asarray([1, "a"], dtype=object)
+    with pytest.raises(ValueError, match="types"):
+        save_model(str(tmp_path), estimator)
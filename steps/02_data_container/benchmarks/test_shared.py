@@ -0,0 +1,87 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = []
+
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from itertools import repeat
+
+import numpy as np
+import pytest
+from joblib import parallel_backend
+
+from benchmarks.shared import open_shared
+from benchmarks.shared import share_array
+from benchmarks.tsf import TimeSeriesForest_3d_np
+from benchmarks.tsf import _fit_trees
+from benchmarks.tsf import _predict_proba_trees
+
+N_JOBS = 4
+PARAMS = {"n_estimators": 8, "random_state": 1, "n_jobs": N_JOBS}
+
+# large enough that pickling the panel for every job shows
+rng = np.random.RandomState(0)
+X = rng.normal(size=(1000, 10, 1000))
+y = rng.randint(0, 2, size=1000)
+X[y == 1] += np.linspace(0, 1, 1000)
+
+
+def _fit_predict(estimator, X, y):
+    return estimator.fit(X, y).predict_proba(X)
+
+
+def _fit_predict_pickling_pool(estimator, X, y):
+    # naive process parallelism over the trees of a fitted estimator, which
+    # pickles X and the estimator for every job, with the same trees as
+    # the estimator's own fit
+    chunks = np.array_split(np.arange(estimator.n_estimators), N_JOBS)
+    intervals = [estimator.intervals[chunk] for chunk in chunks]
+    random_states = [[estimator.random_state] * len(chunk)
+                     for chunk in chunks]
+    with ProcessPoolExecutor(N_JOBS) as pool:
+        trees = list(pool.map(
+            _fit_trees, repeat(estimator._iter_features), repeat(X),
+            repeat(y), intervals, repeat(estimator.base_estimator),
+            random_states))
+        probas = pool.map(_predict_proba_trees,
+                          repeat(estimator._iter_features), repeat(X),
+                          intervals, trees)
+        return sum(chain.from_iterable(probas)) / estimator.n_estimators
+
+
+expected = _fit_predict(TimeSeriesForest_3d_np(**PARAMS), X, y)
+
+
+def test_share_array():
+    with share_array(X) as shared:
+        np.testing.assert_array_equal(open_shared(shared), X)
+        # memory-mapped arrays are shared through their own file
+        with share_array(open_shared(shared)) as reshared:
+            assert reshared.filename == shared.filename
+    assert open_shared(X) is X
+
+
+@pytest.mark.parametrize("mode", ["pickling_pool", "loky", "shared_memory"])
+def test_tsf_3d_np_processes(benchmark, mode):
+    benchmark.group = "tsf_processes"
+    estimator = TimeSeriesForest_3d_np(shared_memory=mode == "shared_memory",
+                                       **PARAMS)
+    if mode == "pickling_pool":
+        estimator.fit(X, y)
+        actual = benchmark(_fit_predict_pickling_pool, estimator, X, y)
+    else:
+        with parallel_backend("loky"):
+            actual = benchmark(_fit_predict, estimator, X, y)
+    np.testing.assert_array_almost_equal(actual, expected)
+
+
+# jobs only receive their own share of the forest, not the whole forest
+def test_tsf_3d_np_job_estimator():
+    estimator = TimeSeriesForest_3d_np(**PARAMS).fit(X[:100], y[:100])
+    job = estimator._job_estimator()
+    assert job.classifiers == [] and len(job.intervals) == 0
+    assert len(estimator.classifiers) == PARAMS["n_estimators"]
+    assert len(pickle.dumps(job)) < len(pickle.dumps(estimator)) / 10
@@ -4,12 +4,18 @@
 __author__ = ["Markus Löning"]
 __all__ = []
 
+import awkward1 as ak
 import numpy as np
+import pytest
 from sktime.utils._testing.series_as_features import \
     make_classification_problem
 
+from benchmarks.long import LongPanel
+from benchmarks.panel import Panel
+from benchmarks.ragged import RaggedPanel
 from benchmarks.utils import ak_3d_arr
 from benchmarks.utils import ak_record_arr
+from benchmarks.utils import make_unequal_length
 from benchmarks.utils import np_3d_arr
 
 
@@ -17,6 +23,11 @@ def _slice(X):
     return X[10:20, 5:15, 50:60]
 
 
+def _chained_slice(X):
+    # chained slices as in preprocessing, equivalent to _slice
+    return X[10:60][:, 5:20][:, :, 40:90][0:10, 0:10, 10:20]
+
+
 def _nested_slice(X):
     x = X.iloc[10:20, 5:15]
     return np.asarray([[x.iloc[i, j].iloc[50:60].to_numpy()
@@ -24,12 +35,34 @@ def _nested_slice(X):
                        for i in range(x.shape[0])])
 
 
+def _nested_slice_values(X):
+    x = X.iloc[10:20, 5:15]
+    return np.concatenate([x.iloc[i, j].iloc[50:60].to_numpy()
+                           for i in range(x.shape[0])
+                           for j in range(x.shape[1])])
+
+
 X, _ = make_classification_problem(n_instances=100,
                                    n_timepoints=100,
                                    n_columns=20)
 
 expected = _slice(np_3d_arr(X))
 
+X_unequal = make_unequal_length(X, min_length=50, random_state=1)
+expected_unequal = _nested_slice_values(X_unequal)
+expected_unequal_sums = np.asarray([[cell.iloc[50:60].sum() for cell in row]
+                                    for row in X_unequal.iloc[10:20, 5:15]
+                                    .to_numpy()])
+
+PANEL_CONTAINERS = {
+    "np_3d": np_3d_arr,
+    "ak_3d": ak_3d_arr,
+    "ak_record": ak_record_arr,
+    "nested": lambda X: X,
+    "ragged": RaggedPanel.from_nested,
+    "long": LongPanel.from_nested,
+}
+
 
 def test_ak_3d_slice(benchmark):
     x = ak_3d_arr(X)
@@ -52,3 +85,62 @@ def test_np_slice(benchmark):
 def test_nested_slice(benchmark):
     actual = benchmark(_nested_slice, X)
     np.testing.assert_array_equal(actual, expected)
+
+
+def test_ragged_slice(benchmark):
+    x = RaggedPanel.from_nested(X)
+    actual = benchmark(_slice, x)
+    np.testing.assert_array_equal(actual.to_3d_numpy(), expected)
+
+
+def test_long_slice(benchmark):
+    x = LongPanel.from_nested(X)
+    actual = benchmark(_slice, x)
+    np.testing.assert_array_equal(actual.to_3d_numpy(), expected)
+
+
+def test_ak_record_slice_unequal(benchmark):
+    x = ak_record_arr(X_unequal)
+    actual = benchmark(_slice, x)
+    np.testing.assert_array_equal(
+        ak.flatten(actual["value"], axis=None), expected_unequal)
+
+
+def test_nested_slice_unequal(benchmark):
+    actual = benchmark(_nested_slice_values, X_unequal)
+    np.testing.assert_array_equal(actual, expected_unequal)
+
+
+def test_ragged_slice_unequal(benchmark):
+    x = RaggedPanel.from_nested(X_unequal)
+    actual = benchmark(_slice, x)
+    np.testing.assert_array_equal(actual.values, expected_unequal)
+
+
+def test_long_slice_unequal(benchmark):
+    x = LongPanel.from_nested(X_unequal)
+    actual = benchmark(_slice, x)
+    np.testing.assert_array_equal(actual.values, expected_unequal)
+
+
+@pytest.mark.parametrize("container", PANEL_CONTAINERS)
+def test_panel_chained_slice(benchmark, container):
+    # slicing a lazy view does not touch the data
+    x = Panel(PANEL_CONTAINERS[container](X))
+    actual = benchmark(_chained_slice, x)
+    np.testing.assert_array_equal(actual.to_numpy(), expected)
+
+
+@pytest.mark.parametrize("container", PANEL_CONTAINERS)
+def test_panel_chained_slice_to_numpy(benchmark, container):
+    x = Panel(PANEL_CONTAINERS[container](X))
+    actual = benchmark(lambda: _chained_slice(x).to_numpy())
+    np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("container", ["ak_record", "nested", "ragged",
+                                       "long"])
+def test_panel_chained_slice_unequal(benchmark, container):
+    x = Panel(PANEL_CONTAINERS[container](X_unequal))
+    actual = benchmark(lambda: _chained_slice(x).sum())
+    np.testing.assert_array_almost_equal(actual, expected_unequal_sums)
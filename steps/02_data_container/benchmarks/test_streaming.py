@@ -0,0 +1,89 @@
+#!/usr/bin/env python3 -u
+# coding: utf-8
+
+__author__ = ["Markus Löning"]
+__all__ = []
+
+import numpy as np
+import pytest
+
+from benchmarks.streaming import StreamingForest
+from benchmarks.tsf import TimeSeriesForest_3d_np
+
+N_STREAMS = 10
+SERIES_LENGTH = 1000
+N_TICKS = 100
+SCORE_EVERY = 10
+
+rng = np.random.RandomState(0)
+X = rng.normal(size=(200, 3, SERIES_LENGTH))
+y = rng.randint(0, 2, size=200)
+X[y == 1] += np.linspace(0, 1, SERIES_LENGTH)
+
+# random walks around a level far from zero, as from sensors
+streams = 10 + 0.1 * rng.normal(
+    size=(N_STREAMS, 3, 3 * SERIES_LENGTH)).cumsum(axis=-1)
+
+
+def _windows(t):
+    return streams[..., t - SERIES_LENGTH:t]
+
+
+@pytest.mark.parametrize("shared_intervals", [True, False])
+def test_streaming_features(shared_intervals):
+    estimator = TimeSeriesForest_3d_np(n_estimators=20, random_state=1,
+                                       shared_intervals=shared_intervals)
+    estimator.fit(X, y)
+    stream = StreamingForest(estimator, n_streams=N_STREAMS)
+    with pytest.raises(ValueError):
+        stream.predict_proba()
+
+    # streams are updated independently, with several rebases of the sums
+    t = 3 * SERIES_LENGTH // 2
+    stream.update(streams[..., :t])
+    stream.update(streams[:2, :, t:t + N_TICKS], streams=[0, 1])
+    expected = np.concatenate([
+        estimator._extract_features(_windows(t + N_TICKS)[:2],
+                                    estimator.intervals),
+        estimator._extract_features(_windows(t)[2:], estimator.intervals)])
+    actual = stream._features(np.arange(N_STREAMS)[:, np.newaxis])
+    np.testing.assert_allclose(actual.reshape(expected.shape), expected,
+                               rtol=1e-9, atol=1e-9)
+    np.testing.assert_array_equal(stream.predict_proba([2, 3]),
+                                  estimator.predict_proba(_windows(t)[2:4]))
+
+
+@pytest.mark.parametrize("method", ["recompute", "streaming"])
+def test_tsf_streaming(benchmark, method):
+    # one point per stream per tick, classifying the current windows every
+    # few ticks
+    benchmark.group = "tsf_streaming"
+    estimator = TimeSeriesForest_3d_np(n_estimators=200, random_state=1,
+                                       packed=True).fit(X, y)
+    ticks = range(SERIES_LENGTH, SERIES_LENGTH + N_TICKS)
+
+    def recompute():
+        # shift the windows and extract all features from scratch
+        windows = streams[..., :SERIES_LENGTH - 1]
+        probas = []
+        for t in ticks:
+            windows = np.concatenate([windows[..., 1 - SERIES_LENGTH:],
+                                      streams[..., t - 1:t]], axis=-1)
+            if t % SCORE_EVERY == 0:
+                probas.append(estimator.predict_proba(windows))
+        return probas
+
+    def stream():
+        stream = StreamingForest(estimator, n_streams=N_STREAMS)
+        stream.update(streams[..., :SERIES_LENGTH - 1])
+        probas = []
+        for t in ticks:
+            stream.update(streams[..., t - 1:t])
+            if t % SCORE_EVERY == 0:
+                probas.append(stream.predict_proba())
+        return probas
+
+    actual = benchmark(recompute if method == "recompute" else stream)
+    expected = [estimator.predict_proba(_windows(t)) for t in ticks
+                if t % SCORE_EVERY == 0]
+    np.testing.assert_array_equal(actual, expected)
@@ -4,17 +4,26 @@
 __author__ = ["Markus Löning"]
 __all__ = []
 
+import time
+
 import numpy as np
+import pytest
+from joblib import parallel_backend
 from sklearn.model_selection import train_test_split
 from sktime.classification.interval_based import TimeSeriesForest
 from sktime.utils._testing.series_as_features import \
     make_classification_problem
 
+from .panel import Panel
+from .tsf import KERNELS
+from .tsf import TimeSeriesForest_dispatch
 from .tsf import TimeSeriesForest_3d_np
 from .tsf import TimeSeriesForest_ak_3d
 from .tsf import TimeSeriesForest_ak_record
+from .tsf import select_kernel
 from .utils import ak_3d_arr
 from .utils import ak_record_arr
+from .utils import make_unequal_length
 from .utils import np_3d_arr
 
 
@@ -55,3 +64,410 @@ def test_tsf_ak_3d(benchmark):
     estimator = TimeSeriesForest_ak_3d(**PARAMS)
     actual = benchmark(_fit_predict, estimator, X_train_ak, y_train, X_test_ak)
     np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("batch_size", [1, 10, 100])
+def test_tsf_3d_np_predict_batch_size(benchmark, batch_size):
+    X_train_np, X_test_np = np_3d_arr(X_train), np_3d_arr(X_test)
+    estimator = TimeSeriesForest_3d_np(**PARAMS).fit(X_train_np, y_train)
+    estimator.set_params(batch_size=batch_size)
+    actual = benchmark(estimator.predict_proba, X_test_np)
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_tsf_3d_np_iter_predict_proba():
+    X_train_np, X_test_np = np_3d_arr(X_train), np_3d_arr(X_test)
+    estimator = TimeSeriesForest_3d_np(**PARAMS).fit(X_train_np, y_train)
+    chunks = np.array_split(X_test_np, 7)
+    actual = np.concatenate(list(estimator.iter_predict_proba(chunks)))
+    np.testing.assert_array_equal(actual, estimator.predict_proba(X_test_np))
+
+
+# scaling of fit/predict with the number of jobs on a larger problem
+X_large, y_large = make_classification_problem(n_instances=500,
+                                               n_timepoints=500)
+X_large_train, X_large_test, y_large_train, y_large_test = train_test_split(
+    np_3d_arr(X_large), y_large)
+
+
+@pytest.mark.parametrize("backend", ["threading", "loky"])
+@pytest.mark.parametrize("n_jobs", [1, 2, 4, 8])
+def test_tsf_3d_np_n_jobs(benchmark, backend, n_jobs):
+    benchmark.group = f"tsf_n_jobs_{backend}"
+    estimator = TimeSeriesForest_3d_np(n_jobs=n_jobs, **PARAMS)
+    with parallel_backend(backend):
+        actual = benchmark(_fit_predict, estimator, X_large_train,
+                           y_large_train, X_large_test)
+
+    # results must not depend on the number of jobs; the serial run is
+    # timed with as many rounds as the benchmark, if timed, i.e. not with
+    # --benchmark-disable, so that the speedup does not depend on other
+    # tests having run before
+    serial = TimeSeriesForest_3d_np(**PARAMS)
+    n_rounds = 1 if benchmark.stats is None else benchmark.stats.stats.rounds
+    serial_times = []
+    for _ in range(n_rounds):
+        start = time.perf_counter()
+        expected = _fit_predict(serial, X_large_train, y_large_train,
+                                X_large_test)
+        serial_times.append(time.perf_counter() - start)
+    np.testing.assert_array_equal(actual, expected)
+
+    if benchmark.stats is not None:
+        serial_time = np.mean(serial_times)
+        benchmark.extra_info["serial_time"] = serial_time
+        benchmark.extra_info["speedup"] = \
+            serial_time / benchmark.stats.stats.mean
+
+
+# multivariate problem, using all variables instead of only the first one
+X_multi, y_multi = make_classification_problem(n_instances=100, n_columns=100,
+                                               n_timepoints=200)
+MULTI_CONTAINERS = {
+    "np_3d": (TimeSeriesForest_3d_np, np_3d_arr),
+    "ak_3d": (TimeSeriesForest_ak_3d, ak_3d_arr),
+    "ak_record": (TimeSeriesForest_ak_record, ak_record_arr),
+}
+
+
+@pytest.mark.parametrize("container", MULTI_CONTAINERS)
+@pytest.mark.parametrize("shared_intervals", [True, False])
+@pytest.mark.parametrize("n_columns", [20, 50, 100])
+def test_tsf_multivariate(benchmark, container, shared_intervals, n_columns):
+    benchmark.group = f"tsf_multivariate_{n_columns}"
+    cls, convert = MULTI_CONTAINERS[container]
+    x = convert(X_multi.iloc[:, :n_columns])
+    params = dict(PARAMS, n_estimators=10, shared_intervals=shared_intervals)
+    actual = benchmark(_fit_predict, cls(**params), x, y_multi, x)
+
+    # all containers must give the same result
+    x_np = np_3d_arr(X_multi.iloc[:, :n_columns])
+    np.testing.assert_array_equal(
+        actual, _fit_predict(TimeSeriesForest_3d_np(**params), x_np, y_multi,
+                             x_np))
+
+
+@pytest.mark.parametrize("container", MULTI_CONTAINERS)
+def test_tsf_multivariate_features(container):
+    # features of all variables extracted in one pass must equal the
+    # features extracted from each variable on its own
+    cls, convert = MULTI_CONTAINERS[container]
+    x = convert(X_multi.iloc[:, :5])
+    x_np = np_3d_arr(X_multi.iloc[:, :5])
+    intervals = np.array([[0, 10], [5, 50], [100, 200]])
+    estimator = cls()
+    actual = estimator._transform(x, intervals)
+    for v in range(x_np.shape[1]):
+        expected = TimeSeriesForest_3d_np()._transform(x_np[:, v:v + 1],
+                                                       intervals)
+        np.testing.assert_array_almost_equal(actual[:, :, v],
+                                             expected[:, :, 0])
+        variables = np.full(intervals.shape[0], v)
+        np.testing.assert_array_almost_equal(
+            estimator._transform(x, intervals, variables), expected[:, :, 0])
+
+
+# low-latency scoring of a few instances, per tree or with packed trees
+@pytest.mark.parametrize("packed", [False, True])
+@pytest.mark.parametrize("n_test_instances", [1, 10, 100])
+def test_tsf_3d_np_packed(benchmark, packed, n_test_instances):
+    benchmark.group = f"tsf_packed_{n_test_instances}"
+    estimator = TimeSeriesForest_3d_np(**PARAMS).fit(X_large_train,
+                                                     y_large_train)
+    X_test = X_large_test[:n_test_instances]
+    expected = estimator.predict_proba(X_test)
+    estimator.set_params(packed=packed)
+    actual = benchmark(estimator.predict_proba, X_test)
+    np.testing.assert_array_almost_equal(actual, expected)
+
+
+# the whole pipeline in single or double precision, from the container to
+# the tree input
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_tsf_3d_np_dtype(benchmark, dtype):
+    benchmark.group = "tsf_dtype"
+    X_train_np = X_large_train.astype(dtype)
+    X_test_np = X_large_test.astype(dtype)
+    estimator = TimeSeriesForest_3d_np(dtype=dtype, **PARAMS)
+    actual = benchmark(_fit_predict, estimator, X_train_np, y_large_train,
+                       X_test_np)
+
+    # single precision must give the same predictions within tolerance
+    expected = _fit_predict(TimeSeriesForest_3d_np(**PARAMS), X_large_train,
+                            y_large_train, X_large_test)
+    np.testing.assert_allclose(actual, expected, atol=0.05)
+    assert np.mean(np.argmax(actual, axis=1)
+                   == np.argmax(expected, axis=1)) > 0.95
+
+
+def test_tsf_3d_np_dtype_features():
+    intervals = np.array([[0, 10], [5, 50], [100, 200], [0, 500]])
+    features = {
+        dtype: TimeSeriesForest_3d_np(dtype=dtype)._transform(
+            X_large_train.astype(dtype), intervals)
+        for dtype in (np.float32, np.float64)
+    }
+    assert features[np.float32].dtype == np.float32
+    np.testing.assert_allclose(features[np.float32], features[np.float64],
+                               rtol=1e-3, atol=1e-4)
+
+
+# short intervals of long non-stationary series, whose sums cancel
+# catastrophically if accumulated in single precision
+def test_tsf_3d_np_dtype_features_random_walk():
+    rng = np.random.RandomState(0)
+    X_walk = np.cumsum(rng.normal(size=(20, 2, 5000)), axis=-1)
+    X_walk = X_walk.astype(np.float32)
+    starts = rng.randint(0, 4990, size=50)
+    intervals = np.column_stack([starts, starts + 10])
+    actual = TimeSeriesForest_3d_np(dtype=np.float32)._transform(
+        X_walk, intervals)
+    expected = TimeSeriesForest_3d_np()._transform(
+        X_walk.astype(np.float64), intervals)
+    assert actual.dtype == np.float32
+    np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-5)
+
+
+# growing a fitted forest only fits the new trees
+@pytest.mark.parametrize("warm_start", [False, True])
+def test_tsf_3d_np_warm_start(benchmark, warm_start):
+    benchmark.group = "tsf_warm_start"
+
+    def setup():
+        estimator = TimeSeriesForest_3d_np(n_estimators=50, random_state=1,
+                                           warm_start=warm_start)
+        estimator.fit(X_large_train, y_large_train)
+        estimator.set_params(n_estimators=100)
+        return (estimator, X_large_train, y_large_train), {}
+
+    def fit(estimator, X, y):
+        return estimator.fit(X, y)
+
+    estimator = benchmark.pedantic(fit, setup=setup, rounds=3)
+    assert len(estimator.classifiers) == 100
+
+    # same forest as fitting all trees at once
+    expected = TimeSeriesForest_3d_np(n_estimators=100, random_state=1).fit(
+        X_large_train, y_large_train)
+    np.testing.assert_array_equal(estimator.intervals, expected.intervals)
+    np.testing.assert_array_equal(estimator.predict_proba(X_large_test),
+                                  expected.predict_proba(X_large_test))
+
+
+# new trees must be fitted on the classes of the fitted trees
+def test_tsf_3d_np_warm_start_classes():
+    estimator = TimeSeriesForest_3d_np(n_estimators=5, random_state=1,
+                                       warm_start=True)
+    estimator.fit(X_large_train, y_large_train)
+    estimator.set_params(n_estimators=10)
+    y_other = np.where(y_large_train == y_large_train[0], "other",
+                       y_large_train)
+    with pytest.raises(ValueError, match="classes"):
+        estimator.fit(X_large_train, y_other)
+    assert len(estimator.classifiers) == 5
+    estimator.fit(X_large_train, y_large_train)
+    assert len(estimator.classifiers) == 10
+
+
+def test_tsf_3d_np_seed_streams():
+    params = {"n_estimators": 20, "random_state": 1, "seed_streams": True}
+    expected = TimeSeriesForest_3d_np(**params).fit(X_large_train,
+                                                    y_large_train)
+    expected_proba = expected.predict_proba(X_large_test)
+
+    # results must not depend on how trees are split across jobs
+    for backend, n_jobs in [("threading", 3), ("loky", 4)]:
+        with parallel_backend(backend):
+            actual = TimeSeriesForest_3d_np(n_jobs=n_jobs, **params).fit(
+                X_large_train, y_large_train)
+        np.testing.assert_array_equal(actual.intervals, expected.intervals)
+        np.testing.assert_array_equal(actual.predict_proba(X_large_test),
+                                      expected_proba)
+
+    # nor on warm-start fits, as each tree has its own streams
+    actual = TimeSeriesForest_3d_np(warm_start=True, **params)
+    for n_estimators in [7, 13, 20]:
+        actual.set_params(n_estimators=n_estimators)
+        actual.fit(X_large_train, y_large_train)
+    np.testing.assert_array_equal(actual.intervals, expected.intervals)
+    np.testing.assert_array_equal(actual.predict_proba(X_large_test),
+                                  expected_proba)
+
+    # trees are independent of the size of the forest, but not the same
+    fewer = TimeSeriesForest_3d_np(**dict(params, n_estimators=5)).fit(
+        X_large_train, y_large_train)
+    np.testing.assert_array_equal(fewer.intervals, expected.intervals[:5])
+    assert len({tree.random_state for tree in expected.classifiers}) == 20
+
+    # intervals have the same bounds as with the default sampler
+    starts, ends = expected.intervals[..., 0], expected.intervals[..., 1]
+    assert np.all(starts >= 0) and np.all(ends < expected.series_length)
+    assert np.all(ends - starts >= expected.min_interval)
+
+
+@pytest.mark.parametrize("seed_streams", [False, True])
+@pytest.mark.parametrize("shared_intervals", [True, False])
+def test_tsf_sample_intervals(benchmark, seed_streams, shared_intervals):
+    benchmark.group = "tsf_sample_intervals"
+    estimator = TimeSeriesForest_3d_np(n_estimators=1, random_state=1,
+                                       shared_intervals=shared_intervals,
+                                       seed_streams=seed_streams)
+    estimator.fit(np_3d_arr(X_multi), y_multi)
+    intervals = benchmark(estimator._draw_intervals, 500)
+    assert intervals.shape[0] == 500
+
+
+def test_tsf_3d_np_panel():
+    # estimators materialize lazy panel views
+    X_train_np, X_test_np = np_3d_arr(X_train), np_3d_arr(X_test)
+    estimator = TimeSeriesForest_3d_np(**PARAMS)
+    actual = _fit_predict(estimator, Panel(X_train_np)[:, :, :],
+                          y_train, Panel(X_test_np)[:, :, :])
+    np.testing.assert_array_equal(actual, expected)
+
+
+# phase breakdown of fit and predict_proba, and overhead of profiling
+@pytest.mark.parametrize("profile", [False, True])
+def test_tsf_3d_np_profile(benchmark, profile):
+    benchmark.group = "tsf_profile"
+    calls = []
+    estimator = TimeSeriesForest_3d_np(
+        n_jobs=2, profile=profile and (lambda *args: calls.append(args)),
+        **PARAMS)
+    actual = benchmark(_fit_predict, estimator, X_large_train,
+                       y_large_train, X_large_test)
+    expected = _fit_predict(TimeSeriesForest_3d_np(**PARAMS), X_large_train,
+                            y_large_train, X_large_test)
+    np.testing.assert_array_equal(actual, expected)
+    if not profile:
+        assert estimator.profile_ == {}
+        return
+
+    assert list(estimator.profile_) == ["fit", "predict_proba"]
+    assert list(estimator.profile_["fit"]) == [
+        "sample_intervals", "extract_features", "fit_trees"]
+    assert list(estimator.profile_["predict_proba"]) == [
+        "extract_features", "predict_trees"]
+    # features are extracted for one tree at a time
+    assert estimator.profile_["fit"]["extract_features"]["calls"] == \
+        PARAMS["n_estimators"]
+    assert calls[-2:] == list(estimator.profile_.items())
+    for method, stats in estimator.profile_.items():
+        for phase, stat in stats.items():
+            benchmark.extra_info[f"{method}_{phase}_time"] = stat["time"]
+            benchmark.extra_info[f"{method}_{phase}_calls"] = stat["calls"]
+
+
+# one estimator for all containers, selecting the kernel from the data
+@pytest.mark.parametrize("container, kernel", [
+    ("np_3d", "numpy"),
+    ("ak_3d", "awkward_regular"),
+    ("ak_record", "awkward_regular"),
+])
+def test_tsf_dispatch(benchmark, container, kernel):
+    benchmark.group = "tsf_dispatch"
+    _, convert = MULTI_CONTAINERS[container]
+    estimator = TimeSeriesForest_dispatch(**PARAMS)
+    actual = benchmark(_fit_predict, estimator, convert(X_train), y_train,
+                       convert(X_test))
+    assert estimator.kernel_ == kernel
+    np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("container", ["ak_3d", "ak_record"])
+def test_tsf_dispatch_override(benchmark, container):
+    benchmark.group = "tsf_dispatch"
+    _, convert = MULTI_CONTAINERS[container]
+    estimator = TimeSeriesForest_dispatch(kernel="awkward", **PARAMS)
+    actual = benchmark(_fit_predict, estimator, convert(X_train), y_train,
+                       convert(X_test))
+    assert estimator.kernel_ == "awkward"
+    np.testing.assert_array_almost_equal(actual, expected)
+
+
+def test_tsf_dispatch_unequal_length():
+    X_unequal = ak_record_arr(make_unequal_length(X_train, min_length=150,
+                                                  random_state=1))
+    estimator = TimeSeriesForest_dispatch(n_estimators=10, random_state=1)
+    estimator.fit(X_unequal, y_train)
+    assert estimator.kernel_ == "awkward"
+    proba = estimator.predict_proba(X_unequal)
+    assert proba.shape == (len(y_train), estimator.n_classes)
+    np.testing.assert_allclose(proba.sum(axis=1), 1)
+    with pytest.raises(ValueError):
+        TimeSeriesForest_dispatch(kernel="awkward_regular").fit(X_unequal,
+                                                                y_train)
+
+
+# slices of awkward arrays, which have ListArray and IndexedArray layouts,
+# still take the numpy path, with the same features as the fallback
+@pytest.mark.parametrize("container", ["ak_3d", "ak_record"])
+@pytest.mark.parametrize("key", [
+    (slice(None), slice(None), slice(0, 100)),
+    (slice(10, 20), slice(0, 2)),
+    (slice(None, None, 2), slice(1, 3), slice(50, 150)),
+])
+def test_tsf_dispatch_regular_slices(container, key):
+    _, convert = MULTI_CONTAINERS[container]
+    x = convert(X_multi.iloc[:, :3])[key]
+    x_np = np_3d_arr(X_multi.iloc[:, :3])[key]
+    kernel, values = select_kernel(Panel(x)[:, :, :].materialize())
+    assert kernel == "awkward_regular"
+    np.testing.assert_array_equal(values, x_np)
+
+    intervals = np.array([[0, 10], [5, 50], [60, 100]])
+    _, data = select_kernel(x, "awkward")
+    fallback = KERNELS["awkward"].transformer(data)(intervals)
+    regular = KERNELS["awkward_regular"].transformer(values)(intervals)
+    np.testing.assert_allclose(regular, fallback, rtol=1e-9, atol=1e-9)
+
+
+def test_tsf_dispatch_kernels():
+    assert list(KERNELS) == ["numpy", "awkward_regular", "awkward", "numba"]
+    X_train_np = np_3d_arr(X_train)
+    with pytest.raises(ValueError):
+        TimeSeriesForest_dispatch(kernel="unknown").fit(X_train_np, y_train)
+    with pytest.raises(ValueError):
+        TimeSeriesForest_dispatch(kernel="awkward").fit(X_train_np, y_train)
+
+
+# compiled kernel, falling back to the numpy kernel without numba
+@pytest.mark.parametrize("kernel", ["numpy", "numba"])
+def test_tsf_dispatch_jit(benchmark, kernel):
+    benchmark.group = "tsf_jit"
+    estimator = TimeSeriesForest_dispatch(kernel=kernel, **PARAMS)
+    # compile outside of the timed rounds
+    estimator.fit(X_large_train[:10], y_large_train[:10])
+    actual = benchmark(_fit_predict, estimator, X_large_train,
+                       y_large_train, X_large_test)
+    expected = _fit_predict(TimeSeriesForest_3d_np(**PARAMS), X_large_train,
+                            y_large_train, X_large_test)
+    np.testing.assert_array_almost_equal(actual, expected)
+
+
+@pytest.mark.parametrize("shared_intervals", [True, False])
+def test_tsf_dispatch_jit_features(shared_intervals):
+    x = np_3d_arr(X_multi.iloc[:, :5])
+    estimator = TimeSeriesForest_dispatch(n_estimators=10, random_state=1,
+                                          shared_intervals=shared_intervals)
+    estimator.fit(x, y_multi)
+    expected = estimator._extract_features(x, estimator.intervals)
+    estimator.set_params(kernel="numba").fit(x, y_multi)
+    actual = estimator._extract_features(x, estimator.intervals)
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9)
+
+
+# single-precision features of the compiled kernel on short intervals of a
+# long random walk, see test_tsf_3d_np_dtype_features_random_walk
+def test_tsf_dispatch_jit_dtype_features():
+    rng = np.random.RandomState(0)
+    X_walk = np.cumsum(rng.normal(size=(20, 2, 5000)), axis=-1)
+    X_walk = X_walk.astype(np.float32)
+    starts = rng.randint(0, 4990, size=50)
+    intervals = np.column_stack([starts, starts + 10])
+    actual = KERNELS["numba"].transformer(X_walk, dtype=np.float32)(
+        intervals)
+    expected = KERNELS["numpy"].transformer(X_walk.astype(np.float64))(
+        intervals)
+    assert actual.dtype == np.float32
+    np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-5)
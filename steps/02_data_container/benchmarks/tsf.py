@@ -4,39 +4,162 @@
 __author__ = ["Markus Löning"]
 __all__ = []
 
+import copy
 import math
+import tempfile
+import warnings
+from collections import OrderedDict
+from collections import namedtuple
+from contextlib import nullcontext
+from functools import partial
+from itertools import chain
 
 import awkward1 as ak
 import numpy as np
+from joblib import Parallel
+from joblib import delayed
 from sklearn.base import clone
+from sklearn.ensemble._base import _partition_estimators
 from sklearn.ensemble._forest import ForestClassifier
 from sklearn.tree import DecisionTreeClassifier
+from sklearn.utils import gen_batches
+from sklearn.utils.fixes import _joblib_parallel_args
 from sklearn.utils.multiclass import class_distribution
 from sklearn.utils.validation import check_random_state
 from sktime.classification.base import BaseClassifier
 
+from benchmarks import jit
+from benchmarks.cache import fingerprint
+from benchmarks.packed import PackedForest
+from benchmarks.panel import Panel
+from benchmarks.profiling import PhaseProfiler
+from benchmarks.profiling import null_phase
+from benchmarks.shared import open_shared
+from benchmarks.shared import share_array
+from benchmarks.utils import ak_values
 
-class TimeSeriesForest_ak_record(ForestClassifier, BaseClassifier):
+
+class _BaseTimeSeriesForest(ForestClassifier, BaseClassifier):
+    """Shared fit/predict logic of the TimeSeriesForest prototypes, which
+    only differ in how they extract interval features from their data
+    container (see `_transform`)
+
+    Parameters
+    ----------
+    random_state : int or RandomState, optional (default=None)
+    min_interval : int, optional (default=3)
+        Minimum length of the random intervals
+    shared_intervals : bool, optional (default=True)
+        If True, features are extracted from all variables on the same
+        random intervals, otherwise intervals are drawn separately for each
+        variable
+    n_estimators : int, optional (default=200)
+    n_jobs : int, optional (default=None)
+        Number of jobs to fit and score trees in parallel, using joblib's
+        current backend (threads unless set otherwise with
+        joblib.parallel_backend)
+    batch_size : int, optional (default=None)
+        Number of instances to extract features from and to score at a
+        time, None processes all instances at once. In fit, each batch is
+        prepared once and the features of all trees are written to a
+        temporary memory-mapped file, so that memory is bounded by one
+        batch of X and the features of one tree
+    cache : IntervalFeatureCache, optional (default=None)
+        Cache of interval features to reuse across fits on the same data,
+        e.g. in cross-validation or hyperparameter search
+    packed : bool, optional (default=False)
+        If True, all trees are packed into flat node arrays and scored in
+        one vectorised traversal, avoiding per-tree overhead for
+        low-latency predictions
+    dtype : numpy dtype, optional (default=np.float64)
+        Floating point type of the features in both fit and predict;
+        np.float32 halves the memory of the features, which trees use in
+        single precision in any case. The cumulative sums they are computed
+        from are always accumulated in double precision, as differences of
+        single-precision sums lose most of the features of short intervals
+        of long series
+    warm_start : bool, optional (default=False)
+        If True, fit keeps the trees and intervals of the previous fit and
+        only adds trees up to n_estimators, drawing their intervals where
+        the previous fit left off, so that growing a forest gives the same
+        trees as fitting it with the final n_estimators from scratch
+    profile : bool or callable, optional (default=False)
+        If True, the wall time and number of calls of the phases of fit and
+        predict_proba (interval sampling, feature extraction, tree fitting
+        and scoring) are recorded in `profile_`; if callable, it is also
+        called with the name of the method and its phase statistics after
+        each call. Times of parallel jobs are summed.
+    shared_memory : bool, optional (default=False)
+        If True, numpy data is placed in a memory-mapped file in shared
+        memory once per call of fit and predict_proba, and parallel jobs
+        only receive its location together with their intervals and trees,
+        instead of a pickled copy of the data. Use with a process-based
+        joblib backend, e.g. joblib.parallel_backend("loky"). Jobs never
+        receive the whole fitted forest, only their share of its trees.
+        Times of phases run in other processes are not profiled.
+    seed_streams : bool, optional (default=False)
+        If True, each tree draws its intervals and the seed of its
+        random_state from its own streams, spawned from random_state with
+        np.random.SeedSequence, and the intervals of all trees are drawn in
+        one vectorised step, so that the forest is the same however its
+        trees are split across jobs or warm-start fits. Otherwise,
+        intervals are drawn one at a time as in sktime's TimeSeriesForest
+        and all trees share random_state.
+
+    Attributes
+    ----------
+    profile_ : dict
+        Phase statistics of the last call of fit and predict_proba, if
+        profiled
+    """
 
     def __init__(self,
                  random_state=None,
                  min_interval=3,
-                 n_estimators=200
+                 n_estimators=200,
+                 shared_intervals=True,
+                 n_jobs=None,
+                 batch_size=None,
+                 cache=None,
+                 packed=False,
+                 dtype=np.float64,
+                 warm_start=False,
+                 profile=False,
+                 shared_memory=False,
+                 seed_streams=False
                  ):
-        super(TimeSeriesForest_ak_record, self).__init__(
+        super(_BaseTimeSeriesForest, self).__init__(
             base_estimator=DecisionTreeClassifier(criterion="entropy"),
-            n_estimators=n_estimators)
+            n_estimators=n_estimators,
+            n_jobs=n_jobs,
+            warm_start=warm_start)
 
         self.random_state = random_state
         self.n_estimators = n_estimators
         self.min_interval = min_interval
+        self.shared_intervals = shared_intervals
+        self.n_jobs = n_jobs
+        self.batch_size = batch_size
+        self.cache = cache
+        self.packed = packed
+        self.dtype = dtype
+        self.warm_start = warm_start
+        self.profile = profile
+        self.shared_memory = shared_memory
+        self.seed_streams = seed_streams
         # The following set in method fit
         self.n_classes = 0
+        self.n_variables = 0
         self.series_length = 0
         self.n_intervals = 0
         self.classifiers = []
         self.intervals = []
         self.classes_ = []
+        self.profile_ = {}
+        self._interval_rng = None
+        self._seed_entropy = None
+        self._packed_forest = None
+        self._profiler = None
 
         # We need to add is-fitted state when inheriting from scikit-learn
         self._is_fitted = False
@@ -46,24 +169,36 @@ class TimeSeriesForest_ak_record(ForestClassifier, BaseClassifier):
         intervals and summary features
         Parameters
         ----------
-        X : array-like or sparse matrix of shape = [n_instances,
-        series_length] or shape = [n_instances,n_columns]
-            The training input samples.  If a Pandas data frame is passed it
-            must have a single column (i.e. univariate
-            classification. RISE has no bespoke method for multivariate
-            classification as yet.
+        X : data container of shape = [n_instances, n_variables,
+        series_length]
+            The training input samples.
         y : array-like, shape =  [n_instances]    The class labels.
 
         Returns
         -------
         self : object
         """
+        X = _materialize(X)
+        self._start_profile()
+        if self.warm_start and self._is_fitted:
+            self._fit_more(X, y)
+        else:
+            self._fit_new(X, y)
+        self._end_profile("fit")
+        return self
+
+    def _fit_new(self, X, y):
+        """Fit a new forest, discarding any previously fitted trees"""
         # X, y = check_X_y(X, y, enforce_univariate=True)
         # X = tabularize(X, return_array=True)
-        assert isinstance(X, ak.highlevel.Array)
-        n_instances, self.series_length = X.shape[0], X[0, 0].shape[0]
+        self._check_X(X)
+        n_instances, self.n_variables, self.series_length = \
+            self._get_shape(X)
 
-        rng = check_random_state(self.random_state)
+        # kept to continue drawing intervals when warm starting
+        self._interval_rng = check_random_state(self.random_state)
+        if self.seed_streams:
+            self._seed_entropy = _seed_entropy(self.random_state)
 
         self.n_classes = np.unique(y).shape[0]
 
@@ -73,51 +208,140 @@ class TimeSeriesForest_ak_record(ForestClassifier, BaseClassifier):
             self.n_intervals = 1
         if self.series_length < self.min_interval:
             self.min_interval = self.series_length
-        self.intervals = np.zeros((self.n_estimators, self.n_intervals, 2),
-                                  dtype=int)
-        for i in range(self.n_estimators):
-            transformed_x = np.empty(shape=(3 * self.n_intervals, n_instances))
-            # Find the random intervals for classifier i and concatentate
-            # features
-            for j in range(self.n_intervals):
-                self.intervals[i][j][0] = rng.randint(
-                    self.series_length - self.min_interval)
-                length = rng.randint(
-                    self.series_length - self.intervals[i][j][0] - 1)
-                if length < self.min_interval:
-                    length = self.min_interval
-                self.intervals[i][j][1] = self.intervals[i][j][0] + length
-                # Transforms here, just hard coding it, so not configurable
-                means = np.mean(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][
-                        1], "value"], axis=1)
-                std_dev = np.std(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][
-                        1], "value"], axis=1)
-                slope = self._lsq_fit(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][
-                        1], "value"])
-                transformed_x[3 * j] = means
-                transformed_x[3 * j + 1] = std_dev
-                transformed_x[3 * j + 2] = slope
-            tree = clone(self.base_estimator)
-            tree.set_params(**{"random_state": self.random_state})
-            transformed_x = transformed_x.T
-            tree.fit(transformed_x, y)
-            self.classifiers.append(tree)
+        with self._phase("sample_intervals"):
+            self.intervals = self._draw_intervals(self.n_estimators)
+        self.classifiers = self._build_trees(
+            X, y, self.intervals, self._tree_random_states(self.n_estimators))
+        self._packed_forest = None
         self._is_fitted = True
-        return self
+
+    def _fit_more(self, X, y):
+        """Add trees to a fitted forest up to n_estimators"""
+        self._check_predict_X(X)
+        classes = np.unique(y)
+        if not np.array_equal(classes, self.classes_):
+            raise ValueError(
+                f"The classes of y: {classes.tolist()} must match the "
+                f"classes of the fitted trees: {list(self.classes_)} when "
+                f"warm_start=True")
+        n_more = self.n_estimators - len(self.classifiers)
+        if n_more < 0:
+            raise ValueError(
+                f"n_estimators={self.n_estimators} must be larger or equal "
+                f"to the number of fitted trees={len(self.classifiers)} when "
+                f"warm_start=True")
+        if n_more == 0:
+            warnings.warn("Warm-start fitting without increasing "
+                          "n_estimators does not fit new trees.")
+            return
+
+        n_fitted = len(self.classifiers)
+        with self._phase("sample_intervals"):
+            intervals = self._draw_intervals(n_more, first=n_fitted)
+        trees = self._build_trees(X, y, intervals,
+                                  self._tree_random_states(n_more,
+                                                           first=n_fitted))
+        self.classifiers = self.classifiers + trees
+        self.intervals = np.concatenate([self.intervals, intervals])
+        self._packed_forest = None
+
+    def _draw_intervals(self, n_estimators, first=0):
+        """Draw the random intervals of the next n_estimators trees
+
+        Parameters
+        ----------
+        n_estimators : int
+        first : int, optional (default=0)
+            Index of the first tree, which selects the seed streams of the
+            trees if seed_streams is True
+
+        Returns
+        -------
+        intervals : array of shape = [n_estimators, n_intervals, 2] if
+        shared across variables, otherwise of shape = [n_estimators,
+        n_variables, n_intervals, 2]
+        """
+        n_variables = 1 if self.shared_intervals else self.n_variables
+        if self.seed_streams:
+            intervals = self._draw_stream_intervals(n_estimators, n_variables,
+                                                    first)
+            return intervals[:, 0] if self.shared_intervals else intervals
+
+        rng = self._interval_rng
+        intervals = np.zeros((n_estimators, n_variables,
+                              self.n_intervals, 2), dtype=int)
+        for i in range(n_estimators):
+            # Find the random intervals for classifier i
+            for v in range(n_variables):
+                for j in range(self.n_intervals):
+                    intervals[i][v][j][0] = rng.randint(
+                        self.series_length - self.min_interval)
+                    length = rng.randint(
+                        self.series_length - intervals[i][v][j][0] - 1)
+                    if length < self.min_interval:
+                        length = self.min_interval
+                    intervals[i][v][j][1] = intervals[i][v][j][0] + length
+        return intervals[:, 0] if self.shared_intervals else intervals
+
+    def _draw_stream_intervals(self, n_estimators, n_variables, first):
+        """Draw intervals as in `_draw_intervals` from the interval stream
+        of each tree, transforming the uniform draws of all trees into
+        intervals at once"""
+        shape = (n_variables, self.n_intervals, 2)
+        draws = np.empty((n_estimators,) + shape)
+        for i in range(n_estimators):
+            rng = np.random.default_rng(
+                _tree_seed_sequence(self._seed_entropy, first + i,
+                                    _INTERVAL_STREAM))
+            draws[i] = rng.random(shape)
+        # floor of uniform draws scaled to n is uniform on 0, ..., n - 1,
+        # as randint(n)
+        starts = (draws[..., 0] * (self.series_length
+                                   - self.min_interval)).astype(int)
+        lengths = (draws[..., 1] * (self.series_length - starts
+                                    - 1)).astype(int)
+        lengths = np.maximum(lengths, self.min_interval)
+        return np.stack([starts, starts + lengths], axis=-1)
+
+    def _tree_random_states(self, n_estimators, first=0):
+        """random_state of each of the next n_estimators trees"""
+        if not self.seed_streams:
+            return [self.random_state] * n_estimators
+        return [int(_tree_seed_sequence(self._seed_entropy, first + i,
+                                        _TREE_STREAM).generate_state(1)[0])
+                for i in range(n_estimators)]
+
+    def _build_trees(self, X, y, intervals, random_states):
+        """Fit one tree per set of intervals
+
+        Returns
+        -------
+        trees : list of fitted trees
+        """
+        # Intervals are drawn up front, so that each job can extract the
+        # features of and fit its share of trees independently, giving the
+        # same trees as the serial path
+        n_jobs, _, starts = _partition_estimators(len(intervals),
+                                                  self.n_jobs)
+        job = self._job_estimator()
+        with self._share(X) as X_job:
+            trees = Parallel(n_jobs=n_jobs,
+                             **_joblib_parallel_args(prefer="threads"))(
+                delayed(_fit_trees)(
+                    job._iter_features, X_job, y,
+                    intervals[starts[k]:starts[k + 1]], self.base_estimator,
+                    random_states[starts[k]:starts[k + 1]], job._phase)
+                for k in range(n_jobs))
+        return list(chain.from_iterable(trees))
 
     def predict(self, X):
         """
         Find predictions for all cases in X. Built on top of predict_proba
         Parameters
         ----------
-        X : The training input samples. array-like or pandas data frame.
-        If a Pandas data frame is passed, a check is performed that it only
-        has one column.
-        If not, an exception is thrown, since this classifier does not yet have
-        multivariate capability.
+        X : data container of shape = [n_test_instances, n_variables,
+        series_length]
+            The test samples, with the same number of variables as in fit.
 
         Returns
         -------
@@ -131,13 +355,9 @@ class TimeSeriesForest_ak_record(ForestClassifier, BaseClassifier):
         Find probability estimates for each class for all cases in X.
         Parameters
         ----------
-        X : The training input samples. array-like or sparse matrix of shape
-        = [n_test_instances, series_length]
-            If a Pandas data frame is passed (sktime format) a check is
-            performed that it only has one column.
-            If not, an exception is thrown, since this classifier does not
-            yet have
-            multivariate capability.
+        X : data container of shape = [n_test_instances, n_variables,
+        series_length]
+            The test samples, with the same number of variables as in fit.
 
         Local variables
         ----------
@@ -151,425 +371,870 @@ class TimeSeriesForest_ak_record(ForestClassifier, BaseClassifier):
         probabilities
         """
         self.check_is_fitted()
+        X = _materialize(X)
+        n_test_instances = self._check_predict_X(X)
+        self._start_profile()
+        if self.batch_size is None:
+            output = self._predict_proba(X)
+        else:
+            # score one batch at a time, so that memory for features and
+            # tree probabilities is bounded by the batch size
+            output = np.empty((n_test_instances, self.n_classes))
+            for batch in gen_batches(n_test_instances, self.batch_size):
+                output[batch] = self._predict_proba(X[batch])
+        self._end_profile("predict_proba")
+        return output
+
+    def iter_predict_proba(self, X_chunks):
+        """
+        Find probability estimates for each chunk of cases in turn, e.g. to
+        score data sets that do not fit into memory
+        Parameters
+        ----------
+        X_chunks : iterable of data containers of shape = [n_chunk_instances,
+        n_variables, series_length]
+
+        Yields
+        -------
+        output : array of shape = [n_chunk_instances, num_classes] of
+        probabilities, the same as returned by predict_proba for these cases
+        """
+        self.check_is_fitted()
+        for X in X_chunks:
+            X = _materialize(X)
+            self._check_predict_X(X)
+            yield self._predict_proba(X)
+
+    def _check_predict_X(self, X):
+        """Check X against the training data and return the number of
+        instances"""
         # X = check_X(X, enforce_univariate=True)
-        assert isinstance(X, ak.highlevel.Array)
+        self._check_X(X)
         # X = tabularize(X, return_array=True)
 
-        n_test_instances, series_length = X.shape[0], X[0, 0].shape[0]
+        n_test_instances, n_variables, series_length = self._get_shape(X)
         if series_length != self.series_length:
             raise TypeError(
                 " ERROR number of attributes in the train does not match "
                 "that in the test data")
-        sums = np.zeros((X.shape[0], self.n_classes), dtype=np.float64)
-        for i in range(0, self.n_estimators):
-            transformed_x = np.empty(
-                shape=(3 * self.n_intervals, n_test_instances),
-                dtype=np.float32)
-            for j in range(0, self.n_intervals):
-                means = np.mean(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][
-                        1], "value"], axis=1)
-                std_dev = np.std(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][
-                        1], "value"],
-                    axis=1)
-                slope = self._lsq_fit(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][
-                        1], "value"])
-                transformed_x[3 * j] = means
-                transformed_x[3 * j + 1] = std_dev
-                transformed_x[3 * j + 2] = slope
-            transformed_x = transformed_x.T
-            sums += self.classifiers[i].predict_proba(transformed_x)
-
-        output = sums / (np.ones(self.n_classes) * self.n_estimators)
+        if n_variables != self.n_variables:
+            raise TypeError(
+                " ERROR number of variables in the train does not match "
+                "that in the test data")
+        return n_test_instances
+
+    def _predict_proba(self, X):
+        if self.packed:
+            return self._predict_proba_packed(X)
+
+        n_test_instances = self._get_shape(X)[0]
+        n_estimators = len(self.classifiers)
+        n_jobs, _, starts = _partition_estimators(n_estimators, self.n_jobs)
+        job = self._job_estimator()
+        with self._share(X) as X_job:
+            probas = Parallel(n_jobs=n_jobs,
+                              **_joblib_parallel_args(prefer="threads"))(
+                delayed(_predict_proba_trees)(
+                    job._iter_features, X_job,
+                    self.intervals[starts[k]:starts[k + 1]],
+                    self.classifiers[starts[k]:starts[k + 1]], job._phase)
+                for k in range(n_jobs))
+
+        # accumulate in tree order, so results do not depend on n_jobs
+        sums = np.zeros((n_test_instances, self.n_classes), dtype=np.float64)
+        for proba in chain.from_iterable(probas):
+            sums += proba
+
+        output = sums / (np.ones(self.n_classes) * n_estimators)
         return output
 
-    def _lsq_fit(self, Y):
-        """ Find the slope for each series (row) of Y
-        Parameters
-        ----------
-        Y: array of shape = [n_samps, interval_size]
+    def _predict_proba_packed(self, X):
+        """Score all trees at once with the packed forest, built on first
+        use after fit"""
+        if self._packed_forest is None:
+            with self._phase("pack_forest"):
+                self._packed_forest = PackedForest.from_trees(
+                    self.classifiers)
+        with self._phase("extract_features"):
+            features = self._extract_features(X, self.intervals)
+        # models loaded with `serialize.load_model` only have the packed
+        # forest, not the trees
+        n_trees = self._packed_forest.n_trees
+        features = features.reshape(features.shape[0], n_trees, -1)
+        with self._phase("predict_trees"):
+            proba = self._packed_forest.predict_proba(features)
+        return proba.sum(axis=1) / n_trees
 
-        Returns
-        ----------
-        slope: array of shape = [n_samps]
+    def _share(self, X):
+        """Context manager yielding the data to pass to parallel jobs,
+        see `shared_memory`"""
+        if self.shared_memory and isinstance(X, np.ndarray):
+            return share_array(X)
+        return nullcontext(X)
 
-        """
-        x = np.arange(Y[0].shape[0]) + 1
-        slope = (np.mean(x * np.array(Y), axis=1)
-                 - np.mean(x) * np.mean(Y, axis=1)) / (
-                        (x * x).mean() - x.mean() ** 2)
-        return slope
+    def _job_estimator(self):
+        """Estimator whose methods are passed to parallel jobs, without the
+        fitted trees and intervals, so that a process-based backend does
+        not pickle the whole forest for every job, which only receives its
+        own share of trees and intervals"""
+        job = copy.copy(self)
+        job.classifiers = []
+        job.intervals = []
+        job._packed_forest = None
+        job._interval_rng = None
+        return job
 
+    def _start_profile(self):
+        self._profiler = PhaseProfiler() if self.profile else None
 
-class TimeSeriesForest_ak_3d(ForestClassifier, BaseClassifier):
+    def _end_profile(self, method):
+        """Store the phase statistics of method and pass them to the
+        profile callback"""
+        if self._profiler is None:
+            return
+        stats = self._profiler.stats
+        self._profiler = None
+        self.profile_[method] = stats
+        if callable(self.profile):
+            self.profile(method, stats)
 
-    def __init__(self,
-                 random_state=None,
-                 min_interval=3,
-                 n_estimators=200
-                 ):
-        super(TimeSeriesForest_ak_3d, self).__init__(
-            base_estimator=DecisionTreeClassifier(criterion="entropy"),
-            n_estimators=n_estimators)
+    def _phase(self, name):
+        """Context manager timing a phase if profiling"""
+        if self._profiler is None:
+            return null_phase(name)
+        return self._profiler.phase(name)
 
-        self.random_state = random_state
-        self.n_estimators = n_estimators
-        self.min_interval = min_interval
-        # The following set in method fit
-        self.n_classes = 0
-        self.series_length = 0
-        self.n_intervals = 0
-        self.classifiers = []
-        self.intervals = []
-        self.classes_ = []
+    def _check_X(self, X):
+        raise NotImplementedError("abstract method")
 
-        # We need to add is-fitted state when inheriting from scikit-learn
-        self._is_fitted = False
+    def _get_shape(self, X):
+        """Return number of instances, variables and series length of X"""
+        return X.shape[0], len(X[0]), X[0, 0].shape[0]
 
-    def fit(self, X, y):
-        """Build a forest of trees from the training set (X, y) using random
-        intervals and summary features
-        Parameters
-        ----------
-        X : array-like or sparse matrix of shape = [n_instances,
-        series_length] or shape = [n_instances,n_columns]
-            The training input samples.  If a Pandas data frame is passed it
-            must have a single column (i.e. univariate
-            classification. RISE has no bespoke method for multivariate
-            classification as yet.
-        y : array-like, shape =  [n_instances]    The class labels.
+    def _extract_features(self, X, intervals):
+        """Interval features of X for the intervals of one or more trees,
+        extracted in batches of `batch_size` instances so that only one
+        batch of X needs to be in memory at a time, e.g. when X is
+        memory-mapped
 
         Returns
         -------
-        self : object
+        features : array of shape = [n_instances, n_trees, ...] with the
+        features of each tree in the trailing dimensions
         """
-        # X, y = check_X_y(X, y, enforce_univariate=True)
-        # X = tabularize(X, return_array=True)
-        assert isinstance(X, ak.highlevel.Array)
-        n_instances, self.series_length = X.shape[0], X[0, 0].shape[0]
+        variables = self._interval_variables()
+        if self.batch_size is None:
+            return self._feature_extractor(X)(intervals, variables)
 
-        rng = check_random_state(self.random_state)
+        n_instances = self._get_shape(X)[0]
+        shape = intervals.shape[:-1]
+        if variables is None:
+            shape += (self.n_variables,)
+        features = np.empty((n_instances,) + shape + (3,), dtype=self.dtype)
+        for batch in gen_batches(n_instances, self.batch_size):
+            features[batch] = self._feature_extractor(X[batch])(intervals,
+                                                                variables)
+        return features
 
-        self.n_classes = np.unique(y).shape[0]
+    def _iter_features(self, X, intervals):
+        """Interval features of X for one tree at a time, so that memory
+        does not grow with the number of trees
 
-        self.classes_ = class_distribution(np.asarray(y).reshape(-1, 1))[0][0]
-        self.n_intervals = int(math.sqrt(self.series_length))
-        if self.n_intervals == 0:
-            self.n_intervals = 1
-        if self.series_length < self.min_interval:
-            self.min_interval = self.series_length
-        self.intervals = np.zeros((self.n_estimators, self.n_intervals, 2),
-                                  dtype=int)
-        for i in range(self.n_estimators):
-            transformed_x = np.empty(shape=(3 * self.n_intervals, n_instances))
-            # Find the random intervals for classifier i and concatentate
-            # features
-            for j in range(self.n_intervals):
-                self.intervals[i][j][0] = rng.randint(
-                    self.series_length - self.min_interval)
-                length = rng.randint(
-                    self.series_length - self.intervals[i][j][0] - 1)
-                if length < self.min_interval:
-                    length = self.min_interval
-                self.intervals[i][j][1] = self.intervals[i][j][0] + length
-                # Transforms here, just hard coding it, so not configurable
-                means = np.mean(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][1]],
-                    axis=1)
-                # bug, hence changed to axis=-1 and squeeze
-                std_dev = np.std(
-                    X[:, :, self.intervals[i][j][0]:self.intervals[i][j][1]],
-                    axis=-1)[:, 0]
-                slope = self._lsq_fit(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][1]])
-                transformed_x[3 * j] = means
-                transformed_x[3 * j + 1] = std_dev
-                transformed_x[3 * j + 2] = slope
-            tree = clone(self.base_estimator)
-            tree.set_params(**{"random_state": self.random_state})
-            transformed_x = transformed_x.T
-            tree.fit(transformed_x, y)
-            self.classifiers.append(tree)
-        self._is_fitted = True
-        return self
+        Without batch_size, X is prepared once, e.g. its cumulative sums,
+        and the features are extracted for a chunk of trees at a time (see
+        `_tree_chunks`). With batch_size, each batch of X is prepared once
+        and the features of all trees are extracted from it, a chunk of
+        trees at a time, into a temporary memory-mapped file, from which
+        they are read one tree at a time, so that only one batch of X and
+        the features of one tree are in memory.
 
-    def predict(self, X):
+        Yields
+        ------
+        features : array of shape = [n_instances, ...] with the features of
+        each tree in turn
         """
-        Find predictions for all cases in X. Built on top of predict_proba
-        Parameters
-        ----------
-        X : The training input samples. array-like or pandas data frame.
-        If a Pandas data frame is passed, a check is performed that it only
-        has one column.
-        If not, an exception is thrown, since this classifier does not yet have
-        multivariate capability.
+        n_trees = len(intervals)
+        variables = self._interval_variables()
+        if self.batch_size is None:
+            extract = self._feature_extractor(X)
+            for chunk in self._tree_chunks(n_trees):
+                yield from np.moveaxis(extract(intervals[chunk], variables),
+                                       1, 0)
+            return
 
-        Returns
-        -------
-        output : array of shape = [n_test_instances]
-        """
-        proba = self.predict_proba(X)
-        return np.asarray([self.classes_[np.argmax(prob)] for prob in proba])
+        n_instances = self._get_shape(X)[0]
+        if n_trees == 0 or n_instances == 0:
+            return
+        shape = intervals.shape[1:-1]
+        if variables is None:
+            shape += (self.n_variables,)
+        shape = (n_trees, n_instances) + shape + (3,)
+        with tempfile.TemporaryFile(prefix="tsf-") as f:
+            features = np.memmap(f, dtype=self.dtype, mode="w+", shape=shape)
+            for batch in gen_batches(n_instances, self.batch_size):
+                extract = self._feature_extractor(X[batch])
+                for chunk in self._tree_chunks(n_trees):
+                    features[chunk, batch] = np.moveaxis(
+                        extract(intervals[chunk], variables), 1, 0)
+            for i in range(n_trees):
+                # copied, so that no features refer to the file once closed
+                yield np.array(features[i])
+            del features
 
-    def predict_proba(self, X):
-        """
-        Find probability estimates for each class for all cases in X.
-        Parameters
-        ----------
-        X : The training input samples. array-like or sparse matrix of shape
-        = [n_test_instances, series_length]
-            If a Pandas data frame is passed (sktime format) a check is
-            performed that it only has one column.
-            If not, an exception is thrown, since this classifier does not
-            yet have
-            multivariate capability.
+    def _tree_chunks(self, n_trees):
+        """Slices of trees whose features are extracted together, taking
+        no more memory than the instances they are extracted from"""
+        # each tree has 3 features per interval and variable, each series
+        # series_length values
+        chunk_size = self.series_length // (3 * self.n_intervals)
+        return gen_batches(n_trees, max(1, chunk_size))
 
-        Local variables
-        ----------
-        n_test_instances     : int, number of cases to classify
-        series_length    : int, number of attributes in X, must match
-        _num_atts determined in fit
+    def _interval_variables(self):
+        """Variable of each interval in the variables argument of
+        `_transform`"""
+        if self.shared_intervals:
+            return None
+        # each interval only applies to its own variable
+        return np.arange(self.n_variables)[:, np.newaxis]
 
-        Returns
-        -------
-        output : array of shape = [n_test_instances, num_classes] of
-        probabilities
+    def _feature_extractor(self, X):
+        """`_transformer`, looking up features in the cache if given, see
+        `_cached_transformer`"""
+        if self.cache is None:
+            return self._transformer(X)
+        return self._cached_transformer(X)
+
+    def _cache_key(self, X):
+        """Key of the features of X in the cache"""
+        return self._fingerprint(X), np.dtype(self.dtype).str
+
+    def _cached_transformer(self, X):
+        """`_transformer` looking up the features of each distinct interval
+        in the cache, only computing those that are missing
+
+        Without variables, the features of all variables of an interval are
+        cached together; with variables, only those of the variable of each
+        interval are computed and cached.
         """
-        self.check_is_fitted()
-        # X = check_X(X, enforce_univariate=True)
-        assert isinstance(X, ak.highlevel.Array)
-        # X = tabularize(X, return_array=True)
+        key = self._cache_key(X)
+        # X is only prepared once features are missing
+        transformer = None
 
-        n_test_instances, series_length = X.shape[0], X[0, 0].shape[0]
-        if series_length != self.series_length:
-            raise TypeError(
-                " ERROR number of attributes in the train does not match "
-                "that in the test data")
-        sums = np.zeros((X.shape[0], self.n_classes), dtype=np.float64)
-        for i in range(0, self.n_estimators):
-            transformed_x = np.empty(
-                shape=(3 * self.n_intervals, n_test_instances),
-                dtype=np.float32)
-            for j in range(0, self.n_intervals):
-                means = np.mean(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][
-                        1]], axis=1)
-                # bug, hence changed to axis=-1 and squeeze
-                std_dev = np.std(
-                    X[:, :, self.intervals[i][j][0]:self.intervals[i][j][1]],
-                    axis=-1)[:, 0]
-                slope = self._lsq_fit(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][
-                        1]])
-                transformed_x[3 * j] = means
-                transformed_x[3 * j + 1] = std_dev
-                transformed_x[3 * j + 2] = slope
-            transformed_x = transformed_x.T
-            sums += self.classifiers[i].predict_proba(transformed_x)
-
-        output = sums / (np.ones(self.n_classes) * self.n_estimators)
-        return output
+        def transform(intervals, variables=None):
+            nonlocal transformer
+            # rows of (start, end) or (start, end, variable)
+            entries = intervals.reshape(-1, 2)
+            if variables is not None:
+                variables = np.broadcast_to(variables, intervals.shape[:-1])
+                entries = np.column_stack([entries, variables.ravel()])
+            unique, inverse = np.unique(entries, axis=0, return_inverse=True)
+            found = [self.cache.get((key, *entry)) for entry in unique]
+            missing = [i for i, features in enumerate(found)
+                       if features is None]
+            if missing:
+                if transformer is None:
+                    transformer = self._transformer(X)
+                if variables is None:
+                    computed = transformer(unique[missing])
+                else:
+                    computed = transformer(unique[missing, :2],
+                                           unique[missing, 2])
+                for i, j in enumerate(missing):
+                    found[j] = np.ascontiguousarray(computed[:, i])
+                    self.cache.put((key, *unique[j]), found[j])
+
+            # features of shape = [n_instances, ..., (n_variables,) 3]
+            features = np.stack(found, axis=1)[:, inverse.ravel()]
+            return features.reshape((features.shape[0],)
+                                    + intervals.shape[:-1]
+                                    + features.shape[2:])
+
+        return transform
 
-    def _lsq_fit(self, Y):
-        """ Find the slope for each series (row) of Y
+    def _fingerprint(self, X):
+        """Fingerprint of the values of X to key the feature cache"""
+        return fingerprint(X)
+
+    def _transform(self, X, intervals, variables=None):
+        """ Find the mean, standard deviation and slope of X for each
+        interval
         Parameters
         ----------
-        Y: array of shape = [n_samps, interval_size]
+        X : data container of shape = [n_instances, n_variables,
+        series_length]
+        intervals : array of shape = [..., 2] of (start, end) pairs
+        variables : array of ints broadcastable to shape = [...], optional
+            Variable of each interval, if None the features of all variables
+            are extracted for each interval
 
         Returns
         ----------
-        slope: array of shape = [n_samps]
+        features: array of shape = [n_instances, ..., n_variables, 3] if
+        variables is None, otherwise of shape = [n_instances, ..., 3]
 
         """
-        x = np.arange(Y[0].shape[0]) + 1
-        slope = (np.mean(x * np.array(Y), axis=1)
-                 - np.mean(x) * np.mean(Y, axis=1)) / (
-                        (x * x).mean() - x.mean() ** 2)
-        return slope
+        return self._transformer(X)(intervals, variables)
+
+    def _transformer(self, X):
+        """Function of intervals and variables computing their features in
+        X as `_transform`, preparing X only once, e.g. its cumulative sums,
+        so that the features of many trees can be extracted in chunks"""
+        raise NotImplementedError("abstract method")
+
+
+class TimeSeriesForest_ak_record(_BaseTimeSeriesForest):
+
+    def _check_X(self, X):
+        assert isinstance(X, ak.highlevel.Array)
+
+    def _transformer(self, X):
+        # take the numpy path if all series share the same time points
+        values = _regular_values(X["value"])
+        if values is not None:
+            return _numpy_transformer(values, dtype=self.dtype)
+        return _awkward_transformer(X["value"], dtype=self.dtype)
+
+    def _fingerprint(self, X):
+        return _awkward_fingerprint(X["value"])
+
+
+class TimeSeriesForest_ak_3d(_BaseTimeSeriesForest):
+
+    def _check_X(self, X):
+        assert isinstance(X, ak.highlevel.Array)
+
+    def _transformer(self, X):
+        # take the numpy path if all series share the same time points
+        values = _regular_values(X)
+        if values is not None:
+            return _numpy_transformer(values, dtype=self.dtype)
+        return _awkward_transformer(X, dtype=self.dtype)
+
+    def _fingerprint(self, X):
+        return _awkward_fingerprint(X)
+
+
+class TimeSeriesForest_3d_np(_BaseTimeSeriesForest):
+
+    def _check_X(self, X):
+        assert isinstance(X, np.ndarray)
+
+    def _get_shape(self, X):
+        return X.shape
+
+    def _transformer(self, X):
+        return _numpy_transformer(X, dtype=self.dtype)
+
+
+class TimeSeriesForest_dispatch(_BaseTimeSeriesForest):
+    """TimeSeriesForest for any supported data container, dispatching
+    feature extraction to a kernel from `KERNELS`
+
+    By default, the first kernel in `KERNELS` that accepts the data is
+    used, so that e.g. awkward arrays of equal-length series use the numpy
+    kernel on a zero-copy view of their values.
+
+    Parameters
+    ----------
+    kernel : str, optional (default=None)
+        Name of the kernel in `KERNELS` to use, None selects the fastest
+        kernel that accepts the data
 
+    The other parameters are the same as for `_BaseTimeSeriesForest`.
 
-class TimeSeriesForest_3d_np(ForestClassifier, BaseClassifier):
+    Attributes
+    ----------
+    kernel_ : str
+        Name of the kernel used in the last call of fit or predict_proba
+    """
 
     def __init__(self,
+                 kernel=None,
                  random_state=None,
                  min_interval=3,
-                 n_estimators=200
+                 n_estimators=200,
+                 shared_intervals=True,
+                 n_jobs=None,
+                 batch_size=None,
+                 cache=None,
+                 packed=False,
+                 dtype=np.float64,
+                 warm_start=False,
+                 profile=False,
+                 shared_memory=False,
+                 seed_streams=False
                  ):
-        super(TimeSeriesForest_3d_np, self).__init__(
-            base_estimator=DecisionTreeClassifier(criterion="entropy"),
-            n_estimators=n_estimators)
+        self.kernel = kernel
+        self.kernel_ = None
+        self._kernel = None
+        super(TimeSeriesForest_dispatch, self).__init__(
+            random_state=random_state,
+            min_interval=min_interval,
+            n_estimators=n_estimators,
+            shared_intervals=shared_intervals,
+            n_jobs=n_jobs,
+            batch_size=batch_size,
+            cache=cache,
+            packed=packed,
+            dtype=dtype,
+            warm_start=warm_start,
+            profile=profile,
+            shared_memory=shared_memory,
+            seed_streams=seed_streams)
 
-        self.random_state = random_state
-        self.n_estimators = n_estimators
-        self.min_interval = min_interval
-        # The following set in method fit
-        self.n_classes = 0
-        self.series_length = 0
-        self.n_intervals = 0
-        self.classifiers = []
-        self.intervals = []
-        self.classes_ = []
+    def fit(self, X, y):
+        X = self._dispatch(X)
+        return super(TimeSeriesForest_dispatch, self).fit(X, y)
 
-        # We need to add is-fitted state when inheriting from scikit-learn
-        self._is_fitted = False
+    def predict_proba(self, X):
+        X = self._dispatch(X)
+        return super(TimeSeriesForest_dispatch, self).predict_proba(X)
 
-    def fit(self, X, y):
-        """Build a forest of trees from the training set (X, y) using random
-        intervals and summary features
-        Parameters
-        ----------
-        X : array-like or sparse matrix of shape = [n_instances,
-        series_length] or shape = [n_instances,n_columns]
-            The training input samples.  If a Pandas data frame is passed it
-            must have a single column (i.e. univariate
-            classification. RISE has no bespoke method for multivariate
-            classification as yet.
-        y : array-like, shape =  [n_instances]    The class labels.
+    def iter_predict_proba(self, X_chunks):
+        return super(TimeSeriesForest_dispatch, self).iter_predict_proba(
+            self._dispatch(X) for X in X_chunks)
 
-        Returns
-        -------
-        self : object
-        """
-        # X, y = check_X_y(X, y, enforce_univariate=True)
-        # X = tabularize(X, return_array=True)
-        assert isinstance(X, np.ndarray)
-        n_instances, _, self.series_length = X.shape
+    def _dispatch(self, X):
+        """Select the kernel for X and return the data it works on"""
+        self.kernel_, X = select_kernel(_materialize(X), self.kernel)
+        self._kernel = KERNELS[self.kernel_]
+        return X
 
-        rng = check_random_state(self.random_state)
+    def _check_X(self, X):
+        # checked by the kernel in _dispatch
+        pass
 
-        self.n_classes = np.unique(y).shape[0]
+    def _get_shape(self, X):
+        return self._kernel.get_shape(X)
 
-        self.classes_ = class_distribution(np.asarray(y).reshape(-1, 1))[0][0]
-        self.n_intervals = int(math.sqrt(self.series_length))
-        if self.n_intervals == 0:
-            self.n_intervals = 1
-        if self.series_length < self.min_interval:
-            self.min_interval = self.series_length
-        self.intervals = np.zeros((self.n_estimators, self.n_intervals, 2),
-                                  dtype=int)
-        for i in range(self.n_estimators):
-            transformed_x = np.empty(shape=(3 * self.n_intervals, n_instances))
-            # Find the random intervals for classifier i and concatentate
-            # features
-            for j in range(self.n_intervals):
-                self.intervals[i][j][0] = rng.randint(
-                    self.series_length - self.min_interval)
-                length = rng.randint(
-                    self.series_length - self.intervals[i][j][0] - 1)
-                if length < self.min_interval:
-                    length = self.min_interval
-                self.intervals[i][j][1] = self.intervals[i][j][0] + length
-                # Transforms here, just hard coding it, so not configurable
-                means = np.mean(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][1]],
-                    axis=1)
-                std_dev = np.std(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][1]],
-                    axis=1)
-                slope = self._lsq_fit(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][1]])
-                transformed_x[3 * j] = means
-                transformed_x[3 * j + 1] = std_dev
-                transformed_x[3 * j + 2] = slope
-            tree = clone(self.base_estimator)
-            tree.set_params(**{"random_state": self.random_state})
-            transformed_x = transformed_x.T
-            tree.fit(transformed_x, y)
-            self.classifiers.append(tree)
-        self._is_fitted = True
-        return self
+    def _transformer(self, X):
+        return self._kernel.transformer(X, dtype=self.dtype)
 
-    def predict(self, X):
-        """
-        Find predictions for all cases in X. Built on top of predict_proba
-        Parameters
-        ----------
-        X : The training input samples. array-like or pandas data frame.
-        If a Pandas data frame is passed, a check is performed that it only
-        has one column.
-        If not, an exception is thrown, since this classifier does not yet have
-        multivariate capability.
+    def _fingerprint(self, X):
+        return self._kernel.fingerprint(X)
 
-        Returns
-        -------
-        output : array of shape = [n_test_instances]
-        """
-        proba = self.predict_proba(X)
-        return np.asarray([self.classes_[np.argmax(prob)] for prob in proba])
 
-    def predict_proba(self, X):
-        """
-        Find probability estimates for each class for all cases in X.
-        Parameters
-        ----------
-        X : The training input samples. array-like or sparse matrix of shape
-        = [n_test_instances, series_length]
-            If a Pandas data frame is passed (sktime format) a check is
-            performed that it only has one column.
-            If not, an exception is thrown, since this classifier does not
-            yet have
-            multivariate capability.
+# streams spawned for each tree if seed_streams is True
+_INTERVAL_STREAM = 0
+_TREE_STREAM = 1
 
-        Local variables
-        ----------
-        n_test_instances     : int, number of cases to classify
-        series_length    : int, number of attributes in X, must match
-        _num_atts determined in fit
 
-        Returns
-        -------
-        output : array of shape = [n_test_instances, num_classes] of
-        probabilities
-        """
-        self.check_is_fitted()
-        # X = check_X(X, enforce_univariate=True)
-        assert isinstance(X, np.ndarray)
-        # X = tabularize(X, return_array=True)
+def _seed_entropy(random_state):
+    """Entropy of the seed streams of the trees, drawn once per fit"""
+    if random_state is None:
+        return np.random.SeedSequence().entropy
+    if isinstance(random_state, (int, np.integer)):
+        return int(random_state)
+    return int(check_random_state(random_state).randint(
+        np.iinfo(np.int32).max))
 
-        n_test_instances, series_length = X.shape[0], X[0, 0].shape[0]
-        if series_length != self.series_length:
-            raise TypeError(
-                " ERROR number of attributes in the train does not match "
-                "that in the test data")
-        sums = np.zeros((X.shape[0], self.n_classes), dtype=np.float64)
-        for i in range(0, self.n_estimators):
-            transformed_x = np.empty(
-                shape=(3 * self.n_intervals, n_test_instances),
-                dtype=np.float32)
-            for j in range(0, self.n_intervals):
-                means = np.mean(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][
-                        1]], axis=1)
-                std_dev = np.std(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][1]],
-                    axis=1)
-                slope = self._lsq_fit(
-                    X[:, 0, self.intervals[i][j][0]:self.intervals[i][j][
-                        1]])
-                transformed_x[3 * j] = means
-                transformed_x[3 * j + 1] = std_dev
-                transformed_x[3 * j + 2] = slope
-            transformed_x = transformed_x.T
-            sums += self.classifiers[i].predict_proba(transformed_x)
-
-        output = sums / (np.ones(self.n_classes) * self.n_estimators)
-        return output
 
-    def _lsq_fit(self, Y):
-        """ Find the slope for each series (row) of Y
-        Parameters
-        ----------
-        Y: array of shape = [n_samps, interval_size]
+def _tree_seed_sequence(entropy, tree, stream):
+    """Seed sequence of a stream of a tree, the same as the child of the
+    root sequence spawned for it, independently of the number of trees"""
+    return np.random.SeedSequence(entropy, spawn_key=(tree, stream))
 
-        Returns
-        ----------
-        slope: array of shape = [n_samps]
 
-        """
-        x = np.arange(Y[0].shape[0]) + 1
-        slope = (np.mean(x * np.array(Y), axis=1)
-                 - np.mean(x) * np.mean(Y, axis=1)) / (
-                        (x * x).mean() - x.mean() ** 2)
-        return slope
+def _materialize(X):
+    """Slice the data of lazy panel views, so that estimators see the
+    underlying container"""
+    return X.materialize() if isinstance(X, Panel) else X
+
+
+_LIST_OFFSET_ARRAYS = (ak.layout.ListOffsetArray32,
+                       ak.layout.ListOffsetArrayU32,
+                       ak.layout.ListOffsetArray64)
+_LIST_ARRAYS = (ak.layout.ListArray32, ak.layout.ListArrayU32,
+                ak.layout.ListArray64)
+_INDEXED_ARRAYS = (ak.layout.IndexedArray32, ak.layout.IndexedArrayU32,
+                   ak.layout.IndexedArray64)
+
+
+def _regular_values(X):
+    """Zero-copy view of the numerical buffer underneath an awkward array
+    whose nested lists all have the same length, or one copy of its values
+    if they are not contiguous in the buffer, e.g. of slices of the array
+
+    Parameters
+    ----------
+    X : awkward array of shape = [n_instances, n_variables, series_length]
+
+    Returns
+    -------
+    values : array of shape = [n_instances, n_variables, series_length],
+    or None if the layout of X is not regular
+    """
+    values = _regular_layout_values(X.layout)
+    if values is None or values.ndim != 3:
+        return None
+    return values
+
+
+def _awkward_fingerprint(X):
+    """Fingerprint of the values and series lengths of an awkward array of
+    shape = [n_instances, n_variables, series_length]"""
+    values = _regular_values(X)
+    if values is not None:
+        return fingerprint(values)
+    return fingerprint(np.asarray(ak.flatten(X, axis=None)),
+                       np.asarray(ak.flatten(ak.num(X, axis=2))))
+
+
+def _regular_layout_values(layout):
+    if isinstance(layout, ak.layout.NumpyArray):
+        return np.asarray(layout)
+
+    if isinstance(layout, ak.layout.RegularArray):
+        content = _regular_layout_values(layout.content)
+        if content is None:
+            return None
+        n, size = len(layout), layout.size
+        return content[:n * size].reshape((n, size) + content.shape[1:])
+
+    if isinstance(layout, _LIST_OFFSET_ARRAYS):
+        offsets = np.asarray(layout.offsets)
+        sizes = np.diff(offsets)
+        if len(sizes) == 0 or np.any(sizes != sizes[0]):
+            return None
+        content = _regular_layout_values(layout.content)
+        if content is None:
+            return None
+        content = content[offsets[0]:offsets[-1]]
+        return content.reshape((len(sizes), sizes[0]) + content.shape[1:])
+
+    if isinstance(layout, _LIST_ARRAYS):
+        # e.g. slices of instances or variables
+        starts = np.asarray(layout.starts)
+        sizes = np.asarray(layout.stops) - starts
+        if len(sizes) == 0 or np.any(sizes != sizes[0]):
+            return None
+        content = _regular_layout_values(layout.content)
+        if content is None:
+            return None
+        size = sizes[0]
+        if np.all(starts == starts[0] + size * np.arange(len(starts))):
+            content = content[starts[0]:starts[0] + size * len(starts)]
+            return content.reshape((len(starts), size) + content.shape[1:])
+        return content[starts[:, np.newaxis] + np.arange(size)]
+
+    if isinstance(layout, _INDEXED_ARRAYS):
+        # e.g. time slices of records
+        content = _regular_layout_values(layout.content)
+        if content is None:
+            return None
+        index = np.asarray(layout.index)
+        if len(index) > 0 and np.all(np.diff(index) == 1):
+            return content[index[0]:index[-1] + 1]
+        return content[index]
+
+    # records, unions, option types etc. are not regular
+    return None
+
+
+def _fit_trees(iter_features, X, y, intervals, base_estimator,
+               random_states, phase=null_phase):
+    """Fit one tree on the features of each set of intervals, used to
+    build a share of the forest within a job, with only the features of
+    one chunk of trees in memory at a time"""
+    X = open_shared(X)
+    features = iter_features(X, intervals)
+    trees = []
+    for i in range(len(intervals)):
+        with phase("extract_features"):
+            transformed_x = next(features)
+        with phase("fit_trees"):
+            tree = clone(base_estimator)
+            tree.set_params(**{"random_state": random_states[i]})
+            tree.fit(transformed_x.reshape(transformed_x.shape[0], -1), y)
+        trees.append(tree)
+    return trees
+
+
+def _predict_proba_trees(iter_features, X, intervals, trees,
+                         phase=null_phase):
+    """Find probability estimates of a share of the forest within a job"""
+    X = open_shared(X)
+    features = iter_features(X, intervals)
+    probas = []
+    for tree in trees:
+        with phase("extract_features"):
+            transformed_x = next(features)
+        with phase("predict_trees"):
+            probas.append(tree.predict_proba(
+                transformed_x.reshape(transformed_x.shape[0], -1)))
+    return probas
+
+
+def _numpy_transformer(X, dtype=np.float64):
+    """Interval features of a 3d numpy array, computed for all variables
+    from their cumulative sums, see `_BaseTimeSeriesForest._transformer`"""
+    cumsums, offset = _cumulative_sums(X)
+    return partial(_interval_features, cumsums, offset, dtype=dtype)
+
+
+def _awkward_transformer(X, dtype=np.float64):
+    """Interval features of an awkward array of unequal-length series, see
+    `_awkward_transform`"""
+    return partial(_awkward_transform, X, dtype=dtype)
+
+
+def _awkward_transform(X, intervals, variables=None, dtype=np.float64):
+    """Interval features of an awkward array of unequal-length series,
+    slicing it for each interval, see `_BaseTimeSeriesForest._transform`"""
+    n_instances = len(X)
+    shape = intervals.shape[:-1]
+    if variables is None:
+        # extract every interval from every variable
+        n_variables = len(X[0])
+        shape += (n_variables,)
+        intervals = np.broadcast_to(intervals[..., np.newaxis, :],
+                                    shape + (2,))
+        variables = np.arange(n_variables)
+
+    flat_intervals = intervals.reshape(-1, 2)
+    flat_variables = np.broadcast_to(variables, shape).ravel()
+    features = np.empty((n_instances, len(flat_intervals), 3), dtype=dtype)
+    for j, ((start, end), v) in enumerate(zip(flat_intervals,
+                                              flat_variables)):
+        # bug, hence sliced to keep the variable axis, axis=-1 and squeeze
+        Y = X[:, v:v + 1, start:end]
+        features[:, j] = _ragged_features(Y)[:, 0]
+    return features.reshape((n_instances,) + shape + (3,))
+
+
+def _lsq_fit(Y):
+    """ Find the slope for each series of Y
+    Parameters
+    ----------
+    Y: array of shape = [..., interval_size]
+
+    Returns
+    ----------
+    slope: array of shape = [...]
+
+    """
+    Y = np.asarray(Y)
+    x = np.arange(Y.shape[-1]) + 1
+    slope = (np.mean(x * Y, axis=-1)
+             - np.mean(x) * np.mean(Y, axis=-1)) / (
+                    (x * x).mean() - x.mean() ** 2)
+    return slope
+
+
+def _ragged_features(Y):
+    """Mean, standard deviation and slope of each series of an awkward
+    array, computed by reductions over the flat values of all series at
+    once, so that series may have different lengths
+
+    The slope is fitted against the time points 1, ..., length of each
+    series, as in `_lsq_fit`. Features that are undefined, e.g. of empty
+    series where an interval starts after the end of a shorter series,
+    are 0.
+
+    Parameters
+    ----------
+    Y : awkward array of shape = [n_instances, n_variables, var]
+
+    Returns
+    -------
+    features : array of shape = [n_instances, n_variables, 3]
+    """
+    # raveled, as regular dimensions are not flattened
+    lengths = np.asarray(ak.flatten(ak.num(Y, axis=-1), axis=None)).ravel()
+    values = np.asarray(ak.flatten(Y, axis=None)).ravel()
+    n_series = lengths.shape[0]
+    series = np.repeat(np.arange(n_series), lengths)
+    starts = np.cumsum(lengths) - lengths
+    x = np.arange(values.shape[0]) - starts[series] + 1
+    # centred on the mean time point (length + 1) / 2 and mean value of
+    # each series
+    x_centred = x - (lengths[series] + 1) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = np.bincount(series, values, minlength=n_series) / lengths
+        y_centred = values - means[series]
+        std_dev = np.sqrt(np.bincount(series, y_centred * y_centred,
+                                      minlength=n_series) / lengths)
+        slope = np.bincount(series, x_centred * y_centred,
+                            minlength=n_series) / np.bincount(
+            series, x_centred * x_centred, minlength=n_series)
+    features = np.stack([means, std_dev, slope], axis=-1)
+    features[~np.isfinite(features)] = 0
+    return features.reshape(len(Y), -1, 3)
+
+
+def _cumulative_sums(X):
+    """Cumulative sums of x, x ** 2 and t * x along the time axis, so that
+    the mean, standard deviation and slope of any interval can be computed
+    in constant time
+
+    The sums are accumulated in double precision whatever the dtype of X,
+    as the features of an interval are differences of two sums, which
+    cancel catastrophically in single precision for short intervals of
+    long series.
+
+    Parameters
+    ----------
+    X : array of shape = [n_instances, n_variables, series_length]
+
+    Returns
+    -------
+    sums : array of shape = [3, n_instances, n_variables, series_length + 1]
+    offset : array of shape = [n_instances, n_variables]
+        Mean of each series, subtracted before accumulating to keep the
+        sums numerically stable for long series
+    """
+    n_instances, n_variables, series_length = X.shape
+    offset = np.mean(X, axis=-1, dtype=np.float64)
+    Xc = np.subtract(X, offset[..., np.newaxis], dtype=np.float64)
+    t = np.arange(series_length, dtype=np.float64)
+    sums = np.zeros((3, n_instances, n_variables, series_length + 1))
+    np.cumsum(Xc, axis=-1, out=sums[0, ..., 1:])
+    np.cumsum(Xc * Xc, axis=-1, out=sums[1, ..., 1:])
+    np.cumsum(t * Xc, axis=-1, out=sums[2, ..., 1:])
+    return sums, offset
+
+
+def _interval_features(sums, offset, intervals, variables=None,
+                       dtype=np.float64):
+    """ Find the mean, standard deviation and slope of all intervals using
+    the cumulative sums from `_cumulative_sums`
+    Parameters
+    ----------
+    sums : array of shape = [3, n_instances, n_variables, series_length + 1]
+    offset : array of shape = [n_instances, n_variables]
+    intervals : array of shape = [..., 2] of (start, end) pairs
+    variables : array of ints broadcastable to shape = [...], optional
+        Variable of each interval, if None all variables are used
+    dtype : numpy dtype, optional (default=np.float64)
+        Floating point type of the features, which are computed in the
+        precision of the sums and only then cast
+
+    Returns
+    ----------
+    features: array of shape = [n_instances, ..., n_variables, 3] if
+    variables is None, otherwise of shape = [n_instances, ..., 3]
+
+    """
+    start, end = intervals[..., 0], intervals[..., 1]
+    if variables is None:
+        # gather all variables at once and move them after the intervals
+        start, end = start[..., np.newaxis], end[..., np.newaxis]
+        totals = np.moveaxis(sums[..., end[..., 0]] - sums[..., start[..., 0]],
+                             2, -1)
+        offset = np.moveaxis(offset[(...,) + (np.newaxis,) * (end.ndim - 1)],
+                             1, -1)
+    else:
+        variables = np.broadcast_to(variables, start.shape)
+        totals = sums[:, :, variables, end] - sums[:, :, variables, start]
+        offset = offset[:, variables]
+    length = end - start
+    # slope of the least-squares fit against the time points within the
+    # interval, as in `_lsq_fit`, which has the same slope as against the
+    # global time index t = start, ..., end - 1
+    t_mean = start + (length - 1) / 2
+    t_var = (length ** 2 - 1) / 12
+    means = totals[0] / length
+    std_dev = np.sqrt(np.maximum(totals[1] / length - means ** 2, 0))
+    slope = (totals[2] / length - t_mean * means) / t_var
+    means += offset
+    features = np.empty(means.shape + (3,), dtype=dtype)
+    features[..., 0] = means
+    features[..., 1] = std_dev
+    features[..., 2] = slope
+    return features
+
+
+# Feature extraction kernels: prepare returns the data the kernel works
+# on, or None if the kernel does not accept the container or its layout
+Kernel = namedtuple("Kernel", ["prepare", "get_shape", "transformer",
+                               "fingerprint"])
+
+
+def _prepare_numpy(X):
+    if isinstance(X, np.ndarray) and X.ndim == 3:
+        return X
+    return None
+
+
+def _prepare_awkward_regular(X):
+    if isinstance(X, ak.highlevel.Array):
+        return _regular_values(ak_values(X))
+    return None
+
+
+def _prepare_regular(X):
+    values = _prepare_numpy(X)
+    if values is None:
+        values = _prepare_awkward_regular(X)
+    return values
+
+
+def _prepare_awkward(X):
+    if isinstance(X, ak.highlevel.Array):
+        return ak_values(X)
+    return None
+
+
+def _jit_transformer(X, dtype=np.float64):
+    """Interval features from the compiled kernel, falling back to the
+    numpy kernel if numba is not installed"""
+    if not jit.NUMBA_AVAILABLE:
+        return _numpy_transformer(X, dtype=dtype)
+    return partial(jit.fused_interval_features, X, dtype=dtype)
+
+
+def _numpy_shape(X):
+    return X.shape
+
+
+def _awkward_shape(X):
+    return len(X), len(X[0]), len(X[0, 0])
+
+
+# ordered from the fastest to the slowest kernel, kernels can be added or
+# reordered to change the automatic selection; the compiled numba kernel
+# comes last, so that it is only used if selected explicitly, as it adds a
+# one-off compilation cost
+KERNELS = OrderedDict([
+    ("numpy", Kernel(_prepare_numpy, _numpy_shape, _numpy_transformer,
+                     fingerprint)),
+    ("awkward_regular", Kernel(_prepare_awkward_regular, _numpy_shape,
+                               _numpy_transformer, fingerprint)),
+    ("awkward", Kernel(_prepare_awkward, _awkward_shape,
+                       _awkward_transformer, _awkward_fingerprint)),
+    ("numba", Kernel(_prepare_regular, _numpy_shape, _jit_transformer,
+                     fingerprint)),
+])
+
+
+def select_kernel(X, kernel=None):
+    """Select the kernel to extract interval features from X
+
+    Parameters
+    ----------
+    X : data container of shape = [n_instances, n_variables,
+    series_length]
+    kernel : str, optional (default=None)
+        Name of the kernel, None selects the first kernel in `KERNELS`
+        that accepts X
+
+    Returns
+    -------
+    name : str
+    data : data of X in the form the kernel works on
+    """
+    if kernel is not None:
+        if kernel not in KERNELS:
+            raise ValueError(f"Unknown kernel: {kernel!r}, expected one of "
+                             f"{list(KERNELS)}")
+        data = KERNELS[kernel].prepare(X)
+        if data is None:
+            raise ValueError(f"Kernel {kernel!r} does not accept data of "
+                             f"type {type(X).__name__} or its layout")
+        return kernel, data
+
+    for name, candidate in KERNELS.items():
+        data = candidate.prepare(X)
+        if data is not None:
+            return name, data
+    raise TypeError(f"No kernel accepts data of type {type(X).__name__}")
@@ -5,7 +5,9 @@ __author__ = ["Markus Löning"]
 __all__ = []
 
 import awkward1 as ak
-from sktime.utils.data_container import nested_to_3d_numpy
+import numpy as np
+import pandas as pd
+from sklearn.utils.validation import check_random_state
 
 
 def _make_ak_array(X):
@@ -43,13 +45,198 @@ def _make_ak_array(X):
     return ak.Array(instances)
 
 
-def ak_3d_arr(X):
-    return ak.Array(nested_to_3d_numpy(X))
+def _nested_to_buffers(X):
+    """Contiguous time and value buffers of a nested pd.DataFrame
 
+    Parameters
+    ----------
+    X : nested pd.DataFrame of shape = [n_instances, n_variables]
 
-def ak_record_arr(X):
-    return _make_ak_array(X)
+    Returns
+    -------
+    times : array of shape = [n_points]
+    values : array of shape = [n_points]
+    offsets : array of shape = [n_instances * n_variables + 1]
+        Start of each series in the buffers, ordered by instance and then
+        variable
+    n_variables : int
+    """
+    cells = X.to_numpy().ravel()
+    lengths = np.fromiter((cell.shape[0] for cell in cells), dtype=np.int64,
+                          count=cells.shape[0])
+    offsets = np.zeros(cells.shape[0] + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    times = np.concatenate([cell.index.to_numpy() for cell in cells])
+    values = np.concatenate([cell.to_numpy() for cell in cells])
+    return times, values, offsets, X.shape[1]
 
 
-def np_3d_arr(X):
-    return nested_to_3d_numpy(X)
+def ak_record_from_buffers(times, values, offsets, n_variables):
+    """Build an awkward record array with "time" and "value" fields from
+    contiguous buffers, without creating any per-point Python objects
+
+    Parameters
+    ----------
+    times : array of shape = [n_points]
+    values : array of shape = [n_points]
+    offsets : array of shape = [n_instances * n_variables + 1]
+        Start of each series in the buffers, ordered by instance and then
+        variable
+    n_variables : int
+
+    Returns
+    -------
+    X : awkward array of shape = [n_instances, n_variables, var * {time,
+    value}]
+    """
+    records = ak.layout.RecordArray(
+        [ak.layout.NumpyArray(np.ascontiguousarray(times)),
+         ak.layout.NumpyArray(np.ascontiguousarray(values))],
+        ["time", "value"])
+    series = ak.layout.ListOffsetArray64(
+        ak.layout.Index64(np.asarray(offsets, dtype=np.int64)), records)
+    return ak.Array(ak.layout.RegularArray(series, n_variables))
+
+
+def ak_values(X):
+    """Values of an awkward array of shape = [n_instances, n_variables,
+    n_timepoints], with or without time records"""
+    return X["value"] if "value" in ak.keys(X) else X
+
+
+def ak_record_to_buffers(X):
+    """Contiguous time and value buffers of an awkward record array, the
+    inverse of `ak_record_from_buffers`
+
+    Parameters
+    ----------
+    X : awkward array of shape = [n_instances, n_variables, var * {time,
+    value}]
+
+    Returns
+    -------
+    times : array of shape = [n_points]
+    values : array of shape = [n_points]
+    offsets : array of shape = [n_instances * n_variables + 1]
+    n_variables : int
+    """
+    n_variables = np.unique(np.asarray(ak.num(X, axis=1)))
+    if n_variables.shape[0] > 1:
+        raise ValueError("All instances must have the same number of "
+                         "variables")
+    lengths = np.asarray(ak.flatten(ak.num(X, axis=2)))
+    offsets = np.zeros(lengths.shape[0] + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    times = np.asarray(ak.flatten(X["time"], axis=None))
+    values = np.asarray(ak.flatten(X["value"], axis=None))
+    return times, values, offsets, int(n_variables[0])
+
+
+def from_nested_to_3d_numpy(X, dtype=None):
+    """Convert a nested pd.DataFrame of equal-length series into a 3d numpy
+    array, copying all series into a preallocated array in one go
+
+    Parameters
+    ----------
+    X : nested pd.DataFrame of shape = [n_instances, n_variables]
+    dtype : numpy dtype, optional (default=None)
+        Defaults to the dtype of the first series
+
+    Returns
+    -------
+    Xt : array of shape = [n_instances, n_variables, n_timepoints]
+    """
+    cells = X.to_numpy()
+    n_instances, n_variables = cells.shape
+    n_timepoints = cells[0, 0].shape[0]
+    if dtype is None:
+        dtype = cells[0, 0].dtype
+    Xt = np.empty((n_instances, n_variables, n_timepoints), dtype=dtype)
+    # reshaping the contiguous output gives a view, so np.stack writes
+    # directly into Xt
+    np.stack([cell.to_numpy() for cell in cells.ravel()],
+             out=Xt.reshape(n_instances * n_variables, n_timepoints))
+    return Xt
+
+
+def from_3d_numpy_to_nested(X, time_index=None, copy=True):
+    """Convert a 3d numpy array into a nested pd.DataFrame
+
+    Parameters
+    ----------
+    X : array of shape = [n_instances, n_variables, n_timepoints]
+    time_index : pd.Index, optional (default=None)
+        Time index shared by all series, defaults to a RangeIndex
+    copy : bool, optional (default=True)
+        If False, the series are views onto X instead of onto a copy of X
+
+    Returns
+    -------
+    Xt : nested pd.DataFrame of shape = [n_instances, n_variables]
+    """
+    n_instances, n_variables, n_timepoints = X.shape
+    if time_index is None:
+        time_index = pd.RangeIndex(n_timepoints)
+    if copy:
+        X = X.copy()
+    cells = np.empty((n_instances, n_variables), dtype=object)
+    for i, j in np.ndindex(n_instances, n_variables):
+        cells[i, j] = pd.Series(X[i, j], index=time_index, copy=False)
+    columns = [f"var_{j}" for j in range(n_variables)]
+    return pd.DataFrame(cells, columns=columns)
+
+
+def make_unequal_length(X, min_length=1, random_state=None):
+    """Truncate each series of a nested pd.DataFrame to a random length
+
+    Parameters
+    ----------
+    X : nested pd.DataFrame of shape = [n_instances, n_variables]
+    min_length : int, optional (default=1)
+    random_state : int or RandomState, optional (default=None)
+
+    Returns
+    -------
+    Xt : nested pd.DataFrame of shape = [n_instances, n_variables]
+    """
+    rng = check_random_state(random_state)
+    return X.applymap(
+        lambda cell: cell.iloc[:rng.randint(min_length, cell.shape[0] + 1)])
+
+
+def nbytes(X):
+    """Memory footprint of a data container in bytes, or None if the
+    container type is unknown
+
+    Parameters
+    ----------
+    X : 3d numpy array, awkward array, (nested) pandas object or any
+    container with an nbytes attribute
+
+    Returns
+    -------
+    nbytes : int or None
+    """
+    if isinstance(X, (pd.DataFrame, pd.Series)):
+        # deep memory usage includes the series stored in nested cells
+        memory_usage = X.memory_usage(index=True, deep=True)
+        return int(np.sum(memory_usage))
+    if isinstance(X, (np.ndarray, ak.highlevel.Array)) or \
+            hasattr(X, "nbytes"):
+        return int(X.nbytes)
+    return None
+
+
+def ak_3d_arr(X, dtype=None):
+    return ak.Array(from_nested_to_3d_numpy(X, dtype=dtype))
+
+
+def ak_record_arr(X, dtype=None):
+    times, values, offsets, n_variables = _nested_to_buffers(X)
+    if dtype is not None:
+        values = values.astype(dtype, copy=False)
+    return ak_record_from_buffers(times, values, offsets, n_variables)
+
+
+def np_3d_arr(X, dtype=None):
+    return from_nested_to_3d_numpy(X, dtype=dtype)